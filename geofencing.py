@@ -5,7 +5,7 @@ Defines the South Florida service area (Miami-Dade, Broward, Palm Beach counties
 and provides functions to check whether coordinates fall within it.
 """
 
-from math import radians, cos, sin, asin, sqrt
+from math import radians, degrees, cos, sin, asin, sqrt, pi
 
 # ---------------------------------------------------------------------------
 # Service area definition -- South Florida tri-county area
@@ -50,6 +50,8 @@ SERVICE_AREA_POLYGON = [
 ]
 
 EARTH_RADIUS_KM = 6371.0
+_DEG_TO_RAD = pi / 180.0
+_HALF_DEG_TO_RAD = pi / 360.0
 
 
 # ---------------------------------------------------------------------------
@@ -69,13 +71,11 @@ def is_in_service_area(lat, lng):
     lng = float(lng)
 
     # --- Fast bounding-box rejection ---
-    bounds = SERVICE_AREA_BOUNDS
-    if (lat < bounds["south"] or lat > bounds["north"]
-            or lng < bounds["west"] or lng > bounds["east"]):
+    if not (_SOUTH <= lat <= _NORTH and _WEST <= lng <= _EAST):
         return False
 
-    # --- Ray-casting point-in-polygon ---
-    return _point_in_polygon(lat, lng, SERVICE_AREA_POLYGON)
+    # --- Ray-casting point-in-polygon (edges precomputed at import) ---
+    return _point_in_edges(lat, lng, _SERVICE_AREA_EDGES)
 
 
 def distance_to_nearest_boundary(lat, lng):
@@ -116,30 +116,103 @@ def get_service_area_info():
     }
 
 
+def radius_bounding_deltas(lat, radius_km):
+    """Return ``(dlat, dlng)`` in degrees of the box enclosing a *radius_km* circle.
+
+    ``dlng`` is 180 when the circle reaches a pole.
+    """
+    arc = radius_km / EARTH_RADIUS_KM
+    sin_arc = sin(min(arc, pi / 2))
+    cos_lat = cos(radians(lat))
+    if sin_arc >= cos_lat:
+        return degrees(arc), 180.0
+    return degrees(arc), degrees(asin(sin_arc / cos_lat))
+
+
+def within_radius(lat, lng, rows, radius_km):
+    """Return the *rows* whose ``current_lat``/``current_lng`` lie within *radius_km*.
+
+    Works on Contractor objects or column rows.  A degree bounding box rejects
+    far-away rows before any trig, and the centre's cosine is computed once
+    rather than per row.
+    """
+    cos_lat0 = cos(radians(lat))
+    dlat_max, dlng_max = radius_bounding_deltas(lat, radius_km)
+    # Haversine term at the radius, so distances compare without asin/sqrt
+    a_max = sin(min(radius_km / (2 * EARTH_RADIUS_KM), pi / 2)) ** 2
+
+    nearby = []
+    for row in rows:
+        r_lat, r_lng = row.current_lat, row.current_lng
+        if r_lat is None or r_lng is None:
+            continue
+        dlat = r_lat - lat
+        dlng = abs(r_lng - lng)
+        if abs(dlat) > dlat_max or min(dlng, 360.0 - dlng) > dlng_max:
+            continue
+        # Degree differences go straight to half-angle radians: one multiply
+        # each instead of separate radians() calls per coordinate.
+        h_lat = sin(dlat * _HALF_DEG_TO_RAD)
+        h_lng = sin(dlng * _HALF_DEG_TO_RAD)
+        if h_lat * h_lat + cos_lat0 * cos(r_lat * _DEG_TO_RAD) * h_lng * h_lng <= a_max:
+            nearby.append(row)
+    return nearby
+
+
+def distances_km(lat, lng, points):
+    """Return the great-circle distance in km from (*lat*, *lng*) to each point.
+
+    *points* is an iterable of ``(lat, lng)`` pairs; a pair with a missing
+    coordinate gives None.  Same result as one haversine call per point,
+    with the centre's cosine computed once.
+    """
+    cos_lat0 = cos(radians(lat))
+    out = []
+    for p_lat, p_lng in points:
+        if p_lat is None or p_lng is None:
+            out.append(None)
+            continue
+        h_lat = sin((p_lat - lat) * _HALF_DEG_TO_RAD)
+        h_lng = sin((p_lng - lng) * _HALF_DEG_TO_RAD)
+        a = h_lat * h_lat + cos_lat0 * cos(p_lat * _DEG_TO_RAD) * h_lng * h_lng
+        out.append(2 * EARTH_RADIUS_KM * asin(sqrt(a)))
+    return out
+
+
 # ---------------------------------------------------------------------------
 # Internal geometry helpers
 # ---------------------------------------------------------------------------
 
-def _point_in_polygon(lat, lng, polygon):
-    """Ray-casting algorithm to test if a point is inside a polygon.
+def _polygon_edges(polygon):
+    """Precompute ray-casting edge data for *polygon*.
 
-    ``polygon`` is a list of (lat, lng) tuples.  The polygon is
-    implicitly closed (last vertex connects back to first).
+    ``polygon`` is a list of (lat, lng) tuples, implicitly closed (the last
+    vertex connects back to the first).  Returns ``(lng_i, lng_j, lat_i,
+    slope)`` per edge, where *slope* is the change in lat per unit lng.
+    Edges parallel to the ray (equal lng) can never be crossed and are
+    dropped.
     """
-    n = len(polygon)
-    inside = False
-
-    px, py = lat, lng
-    j = n - 1
-    for i in range(n):
+    edges = []
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
         xi, yi = polygon[i]
         xj, yj = polygon[j]
-
-        # Check if the ray from (px, py) going in +y direction crosses this edge
-        if ((yi > py) != (yj > py)) and (px < (xj - xi) * (py - yi) / (yj - yi) + xi):
-            inside = not inside
+        if yi != yj:
+            edges.append((yi, yj, xi, (xj - xi) / (yj - yi)))
         j = i
+    return tuple(edges)
+
+
+def _point_in_edges(lat, lng, edges):
+    """Ray-casting test against edges from :func:`_polygon_edges`.
 
+    Casts a ray from (lat, lng) in the +lat direction and counts the edges it
+    crosses; an odd count means the point is inside.
+    """
+    inside = False
+    for yi, yj, xi, slope in edges:
+        if (yi > lng) != (yj > lng) and lat < (lng - yi) * slope + xi:
+            inside = not inside
     return inside
 
 
@@ -179,3 +252,9 @@ def _point_to_segment_distance(px, py, ax, ay, bx, by):
     closest_lng = ay + t * aby
 
     return _haversine(px, py, closest_lat, closest_lng)
+
+
+# Service-area data in the shape the hot checks want, built once at import
+_SOUTH, _NORTH = SERVICE_AREA_BOUNDS["south"], SERVICE_AREA_BOUNDS["north"]
+_WEST, _EAST = SERVICE_AREA_BOUNDS["west"], SERVICE_AREA_BOUNDS["east"]
+_SERVICE_AREA_EDGES = _polygon_edges(SERVICE_AREA_POLYGON)
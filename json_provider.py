@@ -0,0 +1,81 @@
+"""
+Fast JSON provider for Flask.
+
+Uses orjson when it is installed and falls back to Flask's stdlib-based
+provider otherwise.  ``jsonify()`` and ``request.get_json()`` both go
+through ``app.json``, so route code does not need to change.
+
+Both providers emit ``date``/``datetime`` values as ISO 8601 strings and
+serialize any ``Mapping`` (e.g. SQLAlchemy ``RowMapping``) as an object, so
+routes may return query rows as-is instead of building dicts by hand.
+"""
+
+import logging
+from collections.abc import Mapping
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+
+def _default(o):
+    if isinstance(o, Mapping):
+        return dict(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Stdlib provider that serializes dates as ISO 8601 like orjson does."""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson.
+
+    Types orjson does not handle natively (row mappings, Decimal, objects
+    exposing ``__html__``) go through the shared ``_default`` hook.
+    """
+
+    default = staticmethod(_default)
+
+    option = orjson.OPT_NON_STR_KEYS if HAS_ORJSON else 0
+
+    def _option(self):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return self.option | orjson.OPT_INDENT_2
+        return self.option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._option()),
+            mimetype=self.mimetype,
+        )
+
+
+def init_json_provider(app):
+    """Install the orjson provider on *app*, or the ISO stdlib fallback."""
+    if HAS_ORJSON:
+        provider_class = OrjsonProvider
+    else:
+        logger.info("orjson not installed -- using the stdlib JSON provider")
+        provider_class = IsoJSONProvider
+    app.json_provider_class = provider_class
+    app.json = provider_class(app)
@@ -57,6 +57,7 @@ COLUMN_MIGRATIONS = [
     ("contractors", "is_operator", "BOOLEAN", "BOOLEAN", "FALSE"),
     ("contractors", "operator_id", "VARCHAR(36)", "VARCHAR(36)", "NULL"),
     ("contractors", "operator_commission_rate", "FLOAT", "FLOAT", "0.15"),
+    ("contractors", "fleet_size", "INTEGER", "INTEGER", "0"),
 
     # Contractor onboarding fields
     ("contractors", "onboarding_status", "VARCHAR(20)", "VARCHAR(20)", "'pending'"),
@@ -97,6 +98,17 @@ COLUMN_MIGRATIONS = [
 ]
 
 
+# Backfill statements run once, right after the keyed column is added.
+COLUMN_BACKFILLS = {
+    ("contractors", "fleet_size"): (
+        "UPDATE contractors SET fleet_size = ("
+        "SELECT COUNT(*) FROM contractors AS fleet "
+        "WHERE fleet.operator_id = contractors.id"
+        ") WHERE is_operator"
+    ),
+}
+
+
 # ---------------------------------------------------------------------------
 # New table definitions (for tables that may not exist at all)
 # ---------------------------------------------------------------------------
@@ -384,6 +396,75 @@ NEW_TABLE_NAMES = [
 ]
 
 
+# ---------------------------------------------------------------------------
+# Index definitions
+# ---------------------------------------------------------------------------
+# Each entry: (index_name, table, ddl_sqlite, ddl_pg)
+# Composite / covering indexes for hot query predicates.  db.create_all()
+# only creates indexes together with their table, so existing databases
+# pick them up here.  PostgreSQL gets INCLUDE columns and partial
+# predicates where SQLite has no equivalent.
+
+INDEX_MIGRATIONS = [
+    (
+        "ix_jobs_status_created", "jobs",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at DESC)",
+    ),
+    (
+        "ix_payments_status_created", "payments",
+        "CREATE INDEX IF NOT EXISTS ix_payments_status_created ON payments (payment_status, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_payments_status_created ON payments (payment_status, created_at DESC) "
+        "INCLUDE (amount, commission)",
+    ),
+    (
+        "ix_contractors_online_approved", "contractors",
+        "CREATE INDEX IF NOT EXISTS ix_contractors_online_approved ON contractors (is_online, approval_status) "
+        "WHERE is_online",
+        "CREATE INDEX IF NOT EXISTS ix_contractors_online_approved ON contractors (is_online, approval_status) "
+        "WHERE is_online",
+    ),
+    (
+        "ix_contractors_online_location", "contractors",
+        "CREATE INDEX IF NOT EXISTS ix_contractors_online_location "
+        "ON contractors (approval_status, current_lat, current_lng) WHERE is_online",
+        "CREATE INDEX IF NOT EXISTS ix_contractors_online_location "
+        "ON contractors (approval_status, current_lat, current_lng) WHERE is_online",
+    ),
+    (
+        "ix_jobs_open_location", "jobs",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_open_location ON jobs (lat, lng) "
+        "WHERE status IN ('pending', 'confirmed')",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_open_location ON jobs (lat, lng) "
+        "WHERE status IN ('pending', 'confirmed')",
+    ),
+    (
+        "ix_jobs_driver_status_completed", "jobs",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_driver_status_completed "
+        "ON jobs (driver_id, status, completed_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_driver_status_completed "
+        "ON jobs (driver_id, status, completed_at DESC) INCLUDE (total_price, updated_at, created_at)",
+    ),
+    (
+        "ix_users_role_created", "users",
+        "CREATE INDEX IF NOT EXISTS ix_users_role_created ON users (role, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_users_role_created ON users (role, created_at DESC)",
+    ),
+    (
+        "ix_notifications_user_unread", "notifications",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_unread ON notifications (user_id, is_read, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_unread ON notifications (user_id, is_read, created_at DESC)",
+    ),
+    (
+        "ix_chat_messages_unread", "chat_messages",
+        "CREATE INDEX IF NOT EXISTS ix_chat_messages_unread ON chat_messages (job_id, sender_role) "
+        "WHERE read_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS ix_chat_messages_unread ON chat_messages (job_id, sender_role) "
+        "WHERE read_at IS NULL",
+    ),
+]
+
+
 # ---------------------------------------------------------------------------
 # Migration engine
 # ---------------------------------------------------------------------------
@@ -423,6 +504,22 @@ def _table_exists_pg(cursor, table):
     return cursor.fetchone()[0]
 
 
+def _index_exists_sqlite(cursor, name):
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='index' AND name=?",
+        (name,),
+    )
+    return cursor.fetchone() is not None
+
+
+def _index_exists_pg(cursor, name):
+    cursor.execute(
+        "SELECT EXISTS (SELECT FROM pg_indexes WHERE indexname = %s)",
+        (name,),
+    )
+    return cursor.fetchone()[0]
+
+
 def run_migrations(database_url=None):
     """
     Run all pending migrations.
@@ -461,6 +558,10 @@ def run_migrations(database_url=None):
                 actions.append("Added column {}.{}  ({}{})".format(
                     table, column, sql_type, default_clause
                 ))
+                backfill = COLUMN_BACKFILLS.get((table, column))
+                if backfill:
+                    cursor.execute(backfill)
+                    actions.append("Backfilled {}.{}".format(table, column))
 
         # ---- Create new tables ----
         for name, ddl in zip(NEW_TABLE_NAMES, NEW_TABLES_SQLITE):
@@ -470,6 +571,12 @@ def run_migrations(database_url=None):
             else:
                 actions.append("Table {} already exists -- skipped".format(name))
 
+        # ---- Create missing indexes ----
+        for name, table, ddl, _pg_ddl in INDEX_MIGRATIONS:
+            if _table_exists_sqlite(cursor, table) and not _index_exists_sqlite(cursor, name):
+                cursor.execute(ddl)
+                actions.append("Created index {}".format(name))
+
         conn.commit()
         conn.close()
 
@@ -494,6 +601,10 @@ def run_migrations(database_url=None):
                 actions.append("Added column {}.{}  ({}{})".format(
                     table, column, sql_type, default_clause
                 ))
+                backfill = COLUMN_BACKFILLS.get((table, column))
+                if backfill:
+                    cursor.execute(backfill)
+                    actions.append("Backfilled {}.{}".format(table, column))
 
         # ---- Create new tables ----
         for name, ddl in zip(NEW_TABLE_NAMES, NEW_TABLES_PG):
@@ -503,10 +614,16 @@ def run_migrations(database_url=None):
             else:
                 actions.append("Table {} already exists -- skipped".format(name))
 
+        # ---- Create missing indexes ----
+        for name, table, _sqlite_ddl, ddl in INDEX_MIGRATIONS:
+            if _table_exists_pg(cursor, table) and not _index_exists_pg(cursor, name):
+                cursor.execute(ddl)
+                actions.append("Created index {}".format(name))
+
         cursor.close()
         conn.close()
 
-    if not any("Added" in a or "Created table" in a for a in actions):
+    if not any("Added" in a or "Created table" in a or "Created index" in a for a in actions):
         actions.append("Database is up to date -- nothing to do.")
 
     return actions
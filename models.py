@@ -11,7 +11,7 @@ from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import (
     Column, String, Float, Boolean, Integer, Text, DateTime, ForeignKey, JSON,
-    CheckConstraint, Index
+    CheckConstraint, Index, text
 )
 from sqlalchemy.orm import relationship
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -27,6 +27,19 @@ def utcnow():
     return datetime.now(timezone.utc)
 
 
+class _Columns:
+    """Mapping view of a model instance, so a ``row_to_dict`` serializer can
+    take either an ORM object or a ``select()`` row mapping."""
+
+    __slots__ = ("_obj",)
+
+    def __init__(self, obj):
+        self._obj = obj
+
+    def __getitem__(self, key):
+        return getattr(self._obj, key)
+
+
 def generate_referral_code():
     """Generate a unique 8-character alphanumeric referral code."""
     chars = string.ascii_uppercase + string.digits
@@ -62,6 +75,10 @@ class User(db.Model):
     ratings_given = relationship("Rating", foreign_keys="Rating.from_user_id", back_populates="from_user", lazy="dynamic")
     ratings_received = relationship("Rating", foreign_keys="Rating.to_user_id", back_populates="to_user", lazy="dynamic")
 
+    __table_args__ = (
+        Index("ix_users_role_created", "role", created_at.desc()),
+    )
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
@@ -125,6 +142,9 @@ class Contractor(db.Model):
     is_operator = Column(Boolean, default=False)
     operator_id = Column(String(36), ForeignKey("contractors.id", ondelete="SET NULL"), nullable=True, index=True)
     operator_commission_rate = Column(Float, default=0.15)
+    # Denormalized count of fleet contractors (operator_id == self.id);
+    # maintained wherever a contractor joins a fleet.
+    fleet_size = Column(Integer, default=0)
 
     created_at = Column(DateTime, default=utcnow)
     updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
@@ -134,40 +154,58 @@ class Contractor(db.Model):
     # Self-referential: operator -> fleet contractors
     operator = relationship("Contractor", remote_side="Contractor.id", backref="fleet_contractors", foreign_keys=[operator_id])
 
-    def to_dict(self):
+    __table_args__ = (
+        Index(
+            "ix_contractors_online_approved", "is_online", "approval_status",
+            sqlite_where=text("is_online"), postgresql_where=text("is_online"),
+        ),
+        Index(
+            "ix_contractors_online_location",
+            "approval_status", "current_lat", "current_lng",
+            sqlite_where=text("is_online"), postgresql_where=text("is_online"),
+        ),
+    )
+
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize contractor columns from a mapping (e.g. an admin list row)."""
         return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "user": self.user.to_dict() if self.user else None,
-            "license_url": self.license_url,
-            "insurance_url": self.insurance_url,
-            "truck_photos": self.truck_photos or [],
-            "truck_type": self.truck_type,
-            "truck_capacity": self.truck_capacity,
-            "stripe_connect_id": self.stripe_connect_id,
-            "is_online": self.is_online,
-            "current_lat": self.current_lat,
-            "current_lng": self.current_lng,
-            "avg_rating": self.avg_rating,
-            "total_jobs": self.total_jobs,
-            "approval_status": self.approval_status,
-            "availability_schedule": self.availability_schedule or {},
-            "onboarding_status": self.onboarding_status or "pending",
-            "background_check_status": self.background_check_status or "not_started",
-            "insurance_document_url": self.insurance_document_url,
-            "drivers_license_url": self.drivers_license_url,
-            "vehicle_registration_url": self.vehicle_registration_url,
-            "insurance_expiry": self.insurance_expiry.isoformat() if self.insurance_expiry else None,
-            "license_expiry": self.license_expiry.isoformat() if self.license_expiry else None,
-            "onboarding_completed_at": self.onboarding_completed_at.isoformat() if self.onboarding_completed_at else None,
-            "rejection_reason": self.rejection_reason,
-            "is_operator": self.is_operator or False,
-            "operator_id": self.operator_id,
-            "operator_commission_rate": self.operator_commission_rate or 0.15,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "license_url": row["license_url"],
+            "insurance_url": row["insurance_url"],
+            "truck_photos": row["truck_photos"] or [],
+            "truck_type": row["truck_type"],
+            "truck_capacity": row["truck_capacity"],
+            "stripe_connect_id": row["stripe_connect_id"],
+            "is_online": row["is_online"],
+            "current_lat": row["current_lat"],
+            "current_lng": row["current_lng"],
+            "avg_rating": row["avg_rating"],
+            "total_jobs": row["total_jobs"],
+            "approval_status": row["approval_status"],
+            "availability_schedule": row["availability_schedule"] or {},
+            "onboarding_status": row["onboarding_status"] or "pending",
+            "background_check_status": row["background_check_status"] or "not_started",
+            "insurance_document_url": row["insurance_document_url"],
+            "drivers_license_url": row["drivers_license_url"],
+            "vehicle_registration_url": row["vehicle_registration_url"],
+            "insurance_expiry": row["insurance_expiry"].isoformat() if row["insurance_expiry"] else None,
+            "license_expiry": row["license_expiry"].isoformat() if row["license_expiry"] else None,
+            "onboarding_completed_at": row["onboarding_completed_at"].isoformat() if row["onboarding_completed_at"] else None,
+            "rejection_reason": row["rejection_reason"],
+            "is_operator": row["is_operator"] or False,
+            "operator_id": row["operator_id"],
+            "operator_commission_rate": row["operator_commission_rate"] or 0.15,
+            "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+            "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
         }
 
+    def to_dict(self):
+        data = self.row_to_dict(_Columns(self))
+        data["user"] = self.user.to_dict() if self.user else None
+        return data
+
 
 # ---------------------------------------------------------------------------
 # PromoCode
@@ -275,48 +313,63 @@ class Job(db.Model):
     __table_args__ = (
         Index("ix_jobs_status", "status"),
         Index("ix_jobs_location", "lat", "lng"),
+        Index(
+            "ix_jobs_open_location", "lat", "lng",
+            sqlite_where=text("status IN ('pending', 'confirmed')"),
+            postgresql_where=text("status IN ('pending', 'confirmed')"),
+        ),
+        Index("ix_jobs_status_created", "status", created_at.desc()),
+        Index(
+            "ix_jobs_driver_status_completed", "driver_id", "status", completed_at.desc(),
+            postgresql_include=["total_price", "updated_at", "created_at"],
+        ),
     )
 
-    def to_dict(self):
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize job columns from a mapping (e.g. an admin list row)."""
         return {
-            "id": self.id,
-            "customer_id": self.customer_id,
-            "driver_id": self.driver_id,
-            "operator_id": self.operator_id,
-            "status": self.status,
-            "delegated_at": self.delegated_at.isoformat() if self.delegated_at else None,
-            "address": self.address,
-            "lat": self.lat,
-            "lng": self.lng,
-            "items": self.items or [],
-            "volume_estimate": self.volume_estimate,
-            "photos": self.photos or [],
-            "before_photos": self.before_photos or [],
-            "after_photos": self.after_photos or [],
-            "proof_submitted_at": self.proof_submitted_at.isoformat() if self.proof_submitted_at else None,
-            "scheduled_at": self.scheduled_at.isoformat() if self.scheduled_at else None,
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
-            "base_price": self.base_price,
-            "item_total": self.item_total,
-            "volume_price": self.volume_price,
-            "service_fee": self.service_fee,
-            "surge_multiplier": self.surge_multiplier,
-            "total_price": self.total_price,
-            "promo_code_id": self.promo_code_id,
-            "discount_amount": self.discount_amount or 0.0,
-            "notes": self.notes,
-            "confirmation_code": self.confirmation_code,
-            "cancelled_at": self.cancelled_at.isoformat() if self.cancelled_at else None,
-            "cancellation_fee": self.cancellation_fee or 0.0,
-            "rescheduled_count": self.rescheduled_count or 0,
-            "volume_adjustment_proposed": self.volume_adjustment_proposed,
-            "adjusted_volume": self.adjusted_volume,
-            "adjusted_price": self.adjusted_price,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "id": row["id"],
+            "customer_id": row["customer_id"],
+            "driver_id": row["driver_id"],
+            "operator_id": row["operator_id"],
+            "status": row["status"],
+            "delegated_at": row["delegated_at"].isoformat() if row["delegated_at"] else None,
+            "address": row["address"],
+            "lat": row["lat"],
+            "lng": row["lng"],
+            "items": row["items"] or [],
+            "volume_estimate": row["volume_estimate"],
+            "photos": row["photos"] or [],
+            "before_photos": row["before_photos"] or [],
+            "after_photos": row["after_photos"] or [],
+            "proof_submitted_at": row["proof_submitted_at"].isoformat() if row["proof_submitted_at"] else None,
+            "scheduled_at": row["scheduled_at"].isoformat() if row["scheduled_at"] else None,
+            "started_at": row["started_at"].isoformat() if row["started_at"] else None,
+            "completed_at": row["completed_at"].isoformat() if row["completed_at"] else None,
+            "base_price": row["base_price"],
+            "item_total": row["item_total"],
+            "volume_price": row["volume_price"],
+            "service_fee": row["service_fee"],
+            "surge_multiplier": row["surge_multiplier"],
+            "total_price": row["total_price"],
+            "promo_code_id": row["promo_code_id"],
+            "discount_amount": row["discount_amount"] or 0.0,
+            "notes": row["notes"],
+            "confirmation_code": row["confirmation_code"],
+            "cancelled_at": row["cancelled_at"].isoformat() if row["cancelled_at"] else None,
+            "cancellation_fee": row["cancellation_fee"] or 0.0,
+            "rescheduled_count": row["rescheduled_count"] or 0,
+            "volume_adjustment_proposed": row["volume_adjustment_proposed"],
+            "adjusted_volume": row["adjusted_volume"],
+            "adjusted_price": row["adjusted_price"],
+            "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+            "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
         }
 
+    def to_dict(self):
+        return self.row_to_dict(_Columns(self))
+
 
 # ---------------------------------------------------------------------------
 # Rating
@@ -376,6 +429,13 @@ class Payment(db.Model):
 
     job = relationship("Job", back_populates="payment")
 
+    __table_args__ = (
+        Index(
+            "ix_payments_status_created", "payment_status", created_at.desc(),
+            postgresql_include=["amount", "commission"],
+        ),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -471,6 +531,10 @@ class Notification(db.Model):
 
     user = relationship("User", back_populates="notifications")
 
+    __table_args__ = (
+        Index("ix_notifications_user_unread", "user_id", "is_read", created_at.desc()),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -783,6 +847,10 @@ class ChatMessage(db.Model):
     __table_args__ = (
         CheckConstraint("sender_role IN ('customer', 'driver')", name="ck_chat_sender_role"),
         Index("ix_chat_messages_job_created", "job_id", "created_at"),
+        Index(
+            "ix_chat_messages_unread", "job_id", "sender_role",
+            sqlite_where=text("read_at IS NULL"), postgresql_where=text("read_at IS NULL"),
+        ),
     )
 
     def to_dict(self):
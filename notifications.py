@@ -429,3 +429,18 @@ def send_push_notification(user_id, title, body, data=None, category=None):
     except Exception:
         logger.exception("Failed in send_push_notification for user %s", user_id)
         return None
+
+
+def send_push_to_users(user_ids, title, body, data=None, category=None):
+    """Send the same push notification to several users' devices via APNs.
+
+    Delegates to push_notifications.send_push_to_users, which looks up all
+    DeviceTokens in a single query.
+    Never raises.
+    """
+    try:
+        from push_notifications import send_push_to_users as _send_apns_bulk
+        return _send_apns_bulk(user_ids, title, body, data=data, category=category)
+    except Exception:
+        logger.exception("Failed in send_push_to_users for %d user(s)", len(user_ids))
+        return None
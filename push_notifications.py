@@ -15,7 +15,9 @@ Required environment variables:
 import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 import jwt  # PyJWT
@@ -44,12 +46,34 @@ _cached_token: str | None = None
 _cached_token_issued_at: float = 0.0
 _TOKEN_REFRESH_INTERVAL = 50 * 60  # refresh every 50 minutes (valid for 60)
 
+# Outcomes of a single APNs delivery attempt
+_SENT = "sent"
+_FAILED = "failed"
+_INVALID = "invalid"  # rejected by APNs -- token should be removed
+
+# Shared pool for fanning one notification out to many devices
+PUSH_POOL_SIZE = 16
+_push_pool: ThreadPoolExecutor | None = None
+_push_pool_lock = threading.Lock()
+
 
 def _is_configured() -> bool:
     """Return True when all required APNs env vars are set."""
     return bool(APNS_KEY_ID and APNS_TEAM_ID and APNS_AUTH_KEY_PATH and APNS_BUNDLE_ID)
 
 
+def _get_push_pool() -> ThreadPoolExecutor:
+    """Return the process-wide push thread pool, creating it on first use."""
+    global _push_pool
+    if _push_pool is None:
+        with _push_pool_lock:
+            if _push_pool is None:
+                _push_pool = ThreadPoolExecutor(
+                    max_workers=PUSH_POOL_SIZE, thread_name_prefix="apns-push",
+                )
+    return _push_pool
+
+
 def _get_apns_base_url() -> str:
     """Return the APNs gateway URL based on the environment."""
     if os.environ.get("FLASK_ENV", "development") == "development":
@@ -102,11 +126,7 @@ def _get_bearer_token() -> str:
     return token
 
 
-# ---------------------------------------------------------------------------
-# Public API
-# ---------------------------------------------------------------------------
-
-def send_push_to_token(
+def _deliver(
     token: str,
     title: str,
     body: str,
@@ -114,17 +134,18 @@ def send_push_to_token(
     badge: int | None = None,
     sound: str = "default",
     category: str | None = None,
-) -> bool:
-    """Send a push notification to a single APNs device token.
+) -> str:
+    """POST one notification to APNs and return _SENT, _FAILED or _INVALID.
 
-    Returns True on success, False on any failure.  Never raises.
+    Touches no database state, so it is safe to run on a pool thread.
+    Never raises.
     """
     if not _is_configured():
         logger.warning(
             "APNs is not configured (missing env vars). Skipping push to token=%s...",
             token[:12] if token else "None",
         )
-        return False
+        return _FAILED
 
     try:
         import httpx  # imported here so the module can be loaded even if httpx is absent
@@ -167,7 +188,7 @@ def send_push_to_token(
 
         if response.status_code == 200:
             logger.info("APNs push sent successfully to token=%s...", token[:12])
-            return True
+            return _SENT
 
         # APNs returns JSON with a "reason" field on error
         try:
@@ -182,17 +203,40 @@ def send_push_to_token(
             error_body,
         )
 
-        # If the token is invalid, remove it from the database
+        # Invalid tokens are removed from the database by the caller
         if response.status_code == 410 or (
             isinstance(error_body, dict) and error_body.get("reason") == "BadDeviceToken"
         ):
-            _remove_invalid_token(token)
+            return _INVALID
 
-        return False
+        return _FAILED
 
     except Exception:
         logger.exception("APNs push failed with exception for token=%s...", token[:12] if token else "None")
-        return False
+        return _FAILED
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def send_push_to_token(
+    token: str,
+    title: str,
+    body: str,
+    data: dict | None = None,
+    badge: int | None = None,
+    sound: str = "default",
+    category: str | None = None,
+) -> bool:
+    """Send a push notification to a single APNs device token.
+
+    Returns True on success, False on any failure.  Never raises.
+    """
+    result = _deliver(token, title, body, data=data, badge=badge, sound=sound, category=category)
+    if result == _INVALID:
+        _remove_invalid_token(token)
+    return result == _SENT
 
 
 def send_push_notification(
@@ -242,6 +286,64 @@ def send_push_notification(
         return 0
 
 
+def send_push_to_users(
+    user_ids,
+    title: str,
+    body: str,
+    data: dict | None = None,
+    badge: int | None = None,
+    category: str | None = None,
+) -> int:
+    """Send the same push notification to every registered device of *user_ids*.
+
+    Device tokens for all users are fetched in one query rather than one per
+    user.  Returns the number of tokens that were successfully sent to.
+    Never raises.
+    """
+    try:
+        from models import db, DeviceToken
+        from sqlalchemy import select
+
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+
+        tokens = db.session.execute(
+            select(DeviceToken.token).where(
+                DeviceToken.user_id.in_(user_ids),
+                DeviceToken.platform == "ios",
+            )
+        ).scalars().all()
+
+        if not tokens:
+            logger.info("No iOS device tokens registered for %d user(s)", len(user_ids))
+            return 0
+
+        logger.info(
+            "Sending push to %d device(s) for %d user(s): title=%r",
+            len(tokens),
+            len(user_ids),
+            title,
+        )
+
+        # APNs round-trips overlap on the pool; DB cleanup stays on this thread
+        results = list(_get_push_pool().map(
+            lambda token: _deliver(token, title, body, data=data, badge=badge, category=category),
+            tokens,
+        ))
+        for token, result in zip(tokens, results):
+            if result == _INVALID:
+                _remove_invalid_token(token)
+
+        success_count = results.count(_SENT)
+        logger.info("Bulk push results: %d/%d succeeded", success_count, len(tokens))
+        return success_count
+
+    except Exception:
+        logger.exception("send_push_to_users failed for %d user(s)", len(user_ids))
+        return 0
+
+
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
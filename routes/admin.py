@@ -3,12 +3,16 @@ Admin API routes for Umuve.
 Protected by role-based access (admin only).
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+import hashlib
+import threading
 from functools import wraps
 from datetime import datetime, timezone, timedelta
 from collections import defaultdict
 
-from sqlalchemy import func
+from sqlalchemy import func, select, update, bindparam, cast, Float, Numeric
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased, joinedload
 
 import sys
 import os
@@ -19,10 +23,109 @@ from models import (
     PricingConfig, Review, generate_uuid, utcnow,
 )
 from auth_routes import require_auth
+from routes.booking import (
+    invalidate_surge_zone_cache, invalidate_pricing_cache,
+    PRICING_CONFIG_VERSION_KEY,
+)
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/api/admin")
 
 
+def _dialect_insert(model):
+    """Return an INSERT construct that supports ON CONFLICT for the bound engine."""
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def _bump_pricing_version(now):
+    """Rewrite the pricing version row so every worker reloads its pricing.
+
+    Estimate cache keys and signed estimates cover this version, so quotes
+    priced before the edit stop being served or accepted everywhere.
+    """
+    stmt = _dialect_insert(PricingConfig).values(
+        key=PRICING_CONFIG_VERSION_KEY, value=generate_uuid(), updated_at=now,
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def _money_sum(column):
+    """SUM(column) rounded to cents in SQL, returned as a float (0.0 if no rows).
+
+    PostgreSQL only rounds NUMERIC to a scale, hence the cast round-trip.
+    """
+    return cast(
+        func.round(cast(func.coalesce(func.sum(column), 0), Numeric(14, 4)), 2),
+        Float,
+    )
+
+
+def _paginate_rows(stmt, page, per_page):
+    """Paginate a Core select and return (rows, total, page, pages).
+
+    Mirrors ``Query.paginate(error_out=False)`` but yields row mappings, so
+    list endpoints can project only the columns they serialize.
+    """
+    page = max(page or 1, 1)
+    per_page = per_page if per_page and per_page > 0 else 20
+
+    total = db.session.execute(
+        select(func.count()).select_from(stmt.order_by(None).subquery())
+    ).scalar()
+    rows = db.session.execute(
+        stmt.limit(per_page).offset((page - 1) * per_page)
+    ).mappings().all()
+    pages = -(-total // per_page) if total else 0
+    return rows, total, page, pages
+
+
+_OperatorContractor = aliased(Contractor)
+_OperatorUser = aliased(User)
+_DriverContractor = aliased(Contractor)
+_DriverUser = aliased(User)
+_Customer = aliased(User)
+
+_CONTRACTOR_LIST_COLUMNS = list(Contractor.__table__.columns) + [
+    User.name.label("name"),
+    User.email.label("email"),
+    User.phone.label("phone"),
+    _OperatorUser.name.label("operator_name"),
+]
+
+_JOB_LIST_COLUMNS = list(Job.__table__.columns)
+
+_PAYMENT_LIST_COLUMNS = [
+    Payment.id, Payment.job_id, Payment.amount, Payment.commission,
+    Payment.driver_payout_amount,
+    func.coalesce(Payment.operator_payout_amount, 0.0).label("operator_payout_amount"),
+    Payment.payout_status, Payment.payment_status, Payment.tip_amount,
+    Payment.created_at,
+    Job.address.label("job_address"),
+    Job.status.label("job_status"),
+    _DriverUser.name.label("driver_name"),
+    _OperatorUser.name.label("operator_name"),
+    _Customer.name.label("customer_name"),
+]
+
+
+def _contractor_row_to_dict(row):
+    data = Contractor.row_to_dict(row)
+    data.update(
+        name=row["name"],
+        email=row["email"],
+        phone=row["phone"],
+        # Frontend expects "rating" but the model stores "avg_rating"
+        rating=row["avg_rating"],
+        operator_name=row["operator_name"],
+        fleet_size=(row["fleet_size"] or 0) if row["is_operator"] else 0,
+    )
+    return data
+
+
 def require_admin(f):
     """Wrap require_auth and additionally check that the user has admin role."""
     @wraps(f)
@@ -52,13 +155,11 @@ def dashboard(user_id):
     approved_contractors = Contractor.query.filter_by(approval_status="approved").count()
     online_contractors = Contractor.query.filter_by(is_online=True, approval_status="approved").count()
 
-    recent_payments = (
-        Payment.query
+    revenue_30d, commission_30d = (
+        db.session.query(_money_sum(Payment.amount), _money_sum(Payment.commission))
         .filter(Payment.payment_status == "succeeded", Payment.created_at >= thirty_days_ago)
-        .all()
+        .one()
     )
-    revenue_30d = sum(p.amount for p in recent_payments)
-    commission_30d = sum(p.commission for p in recent_payments)
 
     return jsonify({
         "success": True,
@@ -71,8 +172,8 @@ def dashboard(user_id):
             "total_contractors": total_contractors,
             "approved_contractors": approved_contractors,
             "online_contractors": online_contractors,
-            "revenue_30d": round(revenue_30d, 2),
-            "commission_30d": round(commission_30d, 2),
+            "revenue_30d": revenue_30d,
+            "commission_30d": commission_30d,
         },
     }), 200
 
@@ -87,47 +188,33 @@ def list_contractors(user_id):
 
     type_filter = request.args.get("type")
 
-    query = Contractor.query
+    stmt = (
+        select(*_CONTRACTOR_LIST_COLUMNS)
+        .join(User, User.id == Contractor.user_id, isouter=True)
+        .join(_OperatorContractor, _OperatorContractor.id == Contractor.operator_id, isouter=True)
+        .join(_OperatorUser, _OperatorUser.id == _OperatorContractor.user_id, isouter=True)
+    )
     if status_filter:
-        query = query.filter_by(approval_status=status_filter)
+        stmt = stmt.where(Contractor.approval_status == status_filter)
     if type_filter == "operator":
-        query = query.filter_by(is_operator=True)
+        stmt = stmt.where(Contractor.is_operator == True)
     elif type_filter == "fleet":
-        query = query.filter(Contractor.operator_id.isnot(None), Contractor.is_operator == False)
+        stmt = stmt.where(Contractor.operator_id.isnot(None), Contractor.is_operator == False)
     elif type_filter == "independent":
-        query = query.filter(Contractor.operator_id.is_(None), Contractor.is_operator == False)
-
-    pagination = query.order_by(Contractor.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-
-    contractors = []
-    for c in pagination.items:
-        c_data = c.to_dict()
-        # Flatten user fields to the top level so the admin frontend can
-        # access name / email / phone directly (instead of c.user.name etc.)
-        user_obj = c_data.pop("user", None) or {}
-        c_data["name"] = user_obj.get("name")
-        c_data["email"] = user_obj.get("email")
-        c_data["phone"] = user_obj.get("phone")
-        # Frontend expects "rating" but the model stores "avg_rating"
-        c_data["rating"] = c_data.get("avg_rating")
-        # Add operator name for fleet contractors
-        if c.operator_id and c.operator:
-            c_data["operator_name"] = c.operator.user.name if c.operator.user else None
-        else:
-            c_data["operator_name"] = None
-        # Add fleet size for operators
-        if c.is_operator:
-            c_data["fleet_size"] = Contractor.query.filter_by(operator_id=c.id).count()
-        else:
-            c_data["fleet_size"] = 0
-        contractors.append(c_data)
+        stmt = stmt.where(Contractor.operator_id.is_(None), Contractor.is_operator == False)
+
+    rows, total, page, pages = _paginate_rows(
+        stmt.order_by(Contractor.created_at.desc()), page, per_page
+    )
+
+    contractors = [_contractor_row_to_dict(r) for r in rows]
 
     return jsonify({
         "success": True,
         "contractors": contractors,
-        "total": pagination.total,
-        "page": pagination.page,
-        "pages": pagination.pages,
+        "total": total,
+        "page": page,
+        "pages": pages,
     }), 200
 
 
@@ -223,18 +310,20 @@ def list_jobs(user_id):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 20, type=int)
 
-    query = Job.query
+    stmt = select(*_JOB_LIST_COLUMNS)
     if status_filter:
-        query = query.filter_by(status=status_filter)
+        stmt = stmt.where(Job.status == status_filter)
 
-    pagination = query.order_by(Job.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    rows, total, page, pages = _paginate_rows(
+        stmt.order_by(Job.created_at.desc()), page, per_page
+    )
 
     return jsonify({
         "success": True,
-        "jobs": [j.to_dict() for j in pagination.items],
-        "total": pagination.total,
-        "page": pagination.page,
-        "pages": pagination.pages,
+        "jobs": [Job.row_to_dict(r) for r in rows],
+        "total": total,
+        "page": page,
+        "pages": pages,
     }), 200
 
 
@@ -295,37 +384,76 @@ def update_pricing_rules(user_id):
     if not isinstance(rules_data, list):
         return jsonify({"error": "rules must be a list"}), 400
 
-    updated = []
+    # Group rows by the set of fields they carry so a partial update never
+    # clobbers columns the caller left out; usually this is a single group.
+    # A repeated item_type is merged field by field, later entries winning
+    # as when rules were applied one at a time (and because one ON CONFLICT
+    # statement cannot touch the same row twice).
+    now = utcnow()
+    merged = {}
+    item_types = []
     for r in rules_data:
         item_type = r.get("item_type")
         if not item_type:
             continue
 
-        rule = PricingRule.query.filter_by(item_type=item_type).first()
-        if rule:
-            if "base_price" in r:
-                rule.base_price = float(r["base_price"])
-            if "description" in r:
-                rule.description = r["description"]
-            if "is_active" in r:
-                rule.is_active = bool(r["is_active"])
-            rule.updated_at = utcnow()
+        row = merged.setdefault(item_type, {"item_type": item_type})
+        if r.get("base_price") is not None:
+            row["base_price"] = float(r["base_price"])
+        if "description" in r:
+            row["description"] = r["description"]
+        if "is_active" in r:
+            row["is_active"] = bool(r["is_active"])
+        item_types.append(item_type)
+
+    upserts = defaultdict(list)
+    updates = defaultdict(list)
+    for row in merged.values():
+        fields = tuple(sorted(k for k in row if k != "item_type"))
+
+        if "base_price" in row:
+            row.setdefault("is_active", True)
+            row.update(id=generate_uuid(), created_at=now, updated_at=now)
+            upserts[fields].append(row)
         else:
-            base_price = r.get("base_price")
-            if base_price is None:
-                continue
-            rule = PricingRule(
-                id=generate_uuid(),
-                item_type=item_type,
-                base_price=float(base_price),
-                description=r.get("description"),
-                is_active=r.get("is_active", True),
-            )
-            db.session.add(rule)
-        updated.append(rule)
+            # Without a price the rule can only be updated, never created.
+            updates[fields].append(row)
+
+    for fields, rows in upserts.items():
+        stmt = _dialect_insert(PricingRule).values(rows)
+        set_ = {f: stmt.excluded[f] for f in fields}
+        set_["updated_at"] = now
+        stmt = stmt.on_conflict_do_update(index_elements=["item_type"], set_=set_)
+        db.session.execute(stmt)
+
+    for fields, rows in updates.items():
+        if not fields:
+            continue
+        stmt = (
+            update(PricingRule)
+            .where(PricingRule.item_type == bindparam("b_item_type"))
+            .values(updated_at=now, **{f: bindparam("b_" + f) for f in fields})
+        )
+        db.session.connection().execute(
+            stmt, [{"b_" + k: v for k, v in row.items()} for row in rows]
+        )
 
+    if merged:
+        _bump_pricing_version(now)
     db.session.commit()
-    return jsonify({"success": True, "rules": [r.to_dict() for r in updated]}), 200
+    invalidate_pricing_cache()
+
+    rules = []
+    if item_types:
+        by_type = {
+            rule.item_type: rule.to_dict()
+            for rule in PricingRule.query
+            .filter(PricingRule.item_type.in_(merged))
+            .execution_options(populate_existing=True)
+        }
+        # Request order, as the rules were applied
+        rules = [by_type[t] for t in item_types if t in by_type]
+    return jsonify({"success": True, "rules": rules}), 200
 
 
 @admin_bp.route("/pricing/surge", methods=["POST"])
@@ -362,7 +490,10 @@ def upsert_surge_zone(user_id):
         zone.days_of_week = data["days_of_week"]
 
     zone.updated_at = utcnow()
+    _bump_pricing_version(zone.updated_at)
     db.session.commit()
+    invalidate_surge_zone_cache()
+    invalidate_pricing_cache()
 
     return jsonify({"success": True, "surge_zone": zone.to_dict()}), 200
 
@@ -438,26 +569,24 @@ def analytics(user_id):
 
     # -- jobs_by_day: last 30 days -------------------------------------------
     thirty_days_ago = now - timedelta(days=30)
-    recent_jobs = (
-        Job.query
+    recent_job_dates = (
+        db.session.query(Job.created_at)
         .filter(Job.created_at >= thirty_days_ago)
         .all()
     )
     jobs_day_map = defaultdict(int)
-    for j in recent_jobs:
-        if j.created_at:
-            day_key = j.created_at.strftime("%Y-%m-%d")
-            jobs_day_map[day_key] += 1
+    for (created_at,) in recent_job_dates:
+        if created_at:
+            jobs_day_map[created_at.date().isoformat()] += 1
 
-    jobs_by_day = []
-    for offset in range(30):
-        day = (now - timedelta(days=29 - offset)).strftime("%Y-%m-%d")
-        jobs_by_day.append({"date": day, "count": jobs_day_map.get(day, 0)})
+    today = now.date()
+    days = [(today - timedelta(days=29 - offset)).isoformat() for offset in range(30)]
+    jobs_by_day = [{"date": day, "count": jobs_day_map.get(day, 0)} for day in days]
 
     # -- revenue_by_week: last 12 weeks --------------------------------------
     twelve_weeks_ago = now - timedelta(weeks=12)
     recent_payments = (
-        Payment.query
+        db.session.query(Payment.created_at, Payment.amount)
         .filter(
             Payment.payment_status == "succeeded",
             Payment.created_at >= twelve_weeks_ago,
@@ -465,22 +594,18 @@ def analytics(user_id):
         .all()
     )
     week_map = defaultdict(float)
-    for p in recent_payments:
-        if p.created_at:
+    for created_at, amount in recent_payments:
+        if created_at:
             # ISO week start (Monday)
-            week_start = p.created_at - timedelta(days=p.created_at.weekday())
-            week_key = week_start.strftime("%Y-%m-%d")
-            week_map[week_key] += p.amount
-
-    revenue_by_week = []
-    for w in range(12):
-        ref = now - timedelta(weeks=11 - w)
-        week_start = ref - timedelta(days=ref.weekday())
-        week_key = week_start.strftime("%Y-%m-%d")
-        revenue_by_week.append({
-            "week_start": week_key,
-            "revenue": round(week_map.get(week_key, 0.0), 2),
-        })
+            day = created_at.date()
+            week_map[(day - timedelta(days=day.weekday())).isoformat()] += amount
+
+    this_monday = today - timedelta(days=today.weekday())
+    week_keys = [(this_monday - timedelta(weeks=11 - w)).isoformat() for w in range(12)]
+    revenue_by_week = [
+        {"week_start": week_key, "revenue": round(week_map.get(week_key, 0.0), 2)}
+        for week_key in week_keys
+    ]
 
     # -- jobs_by_status ------------------------------------------------------
     status_rows = (
@@ -613,13 +738,20 @@ def assign_job(user_id, job_id):
     if not contractor_id:
         return jsonify({"error": "contractor_id is required"}), 400
 
-    contractor = db.session.get(Contractor, contractor_id)
+    contractor = db.session.get(
+        Contractor, contractor_id, options=[joinedload(Contractor.user)]
+    )
     if not contractor:
         return jsonify({"error": "Contractor not found"}), 404
 
     if contractor.approval_status != "approved":
         return jsonify({"error": "Contractor is not approved"}), 403
 
+    from socket_events import broadcast_job_status, socketio
+
+    # Everything below is prepared up front and committed once; the
+    # response is read before commit() so nothing reloads job / contractor.
+
     # If assigning to an operator, set as delegating (operator will assign to fleet)
     if contractor.is_operator:
         job.operator_id = contractor.id
@@ -628,26 +760,26 @@ def assign_job(user_id, job_id):
         job.updated_at = utcnow()
 
         # Notify operator
-        notification = Notification(
+        db.session.add(Notification(
             id=generate_uuid(),
             user_id=contractor.user_id,
             type="job_assigned",
             title="New Job for Delegation",
             body="A job at {} needs delegation to your fleet.".format(job.address or "an address"),
             data={"job_id": job.id, "address": job.address, "total_price": job.total_price},
-        )
-        db.session.add(notification)
+        ))
+        # Read before commit() expires the loaded rows
+        job_dict = job.to_dict()
         db.session.commit()
 
-        from socket_events import broadcast_job_status, socketio
-        broadcast_job_status(job.id, job.status, {"operator_id": contractor.id})
+        broadcast_job_status(job_dict["id"], job_dict["status"], {"operator_id": contractor_id})
         socketio.emit("operator:new-job", {
-            "job_id": job.id,
-            "address": job.address,
-            "total_price": job.total_price,
-        }, room="operator:{}".format(contractor.id))
+            "job_id": job_dict["id"],
+            "address": job_dict["address"],
+            "total_price": job_dict["total_price"],
+        }, room="operator:{}".format(contractor_id))
 
-        return jsonify({"success": True, "job": job.to_dict()}), 200
+        return jsonify({"success": True, "job": job_dict}), 200
 
     # Regular contractor assignment
     job.driver_id = contractor.id
@@ -655,94 +787,124 @@ def assign_job(user_id, job_id):
         job.status = "assigned"
     job.updated_at = utcnow()
 
-    # Notify driver
-    notification = Notification(
-        id=generate_uuid(),
-        user_id=contractor.user_id,
-        type="job_assigned",
-        title="New Job Assigned",
-        body="An admin has assigned you a job at {}.".format(job.address or "an address"),
-        data={"job_id": job.id, "address": job.address, "total_price": job.total_price},
-    )
-    db.session.add(notification)
-
-    # Notify customer
-    notification_cust = Notification(
-        id=generate_uuid(),
-        user_id=job.customer_id,
-        type="job_update",
-        title="Driver Assigned",
-        body="A driver has been assigned to your job.",
-        data={"job_id": job.id, "status": "assigned"},
-    )
-    db.session.add(notification_cust)
-    db.session.commit()
-
-    # --- Email / SMS / Push notifications ---
+    db.session.add_all([
+        # Notify driver
+        Notification(
+            id=generate_uuid(),
+            user_id=contractor.user_id,
+            type="job_assigned",
+            title="New Job Assigned",
+            body="An admin has assigned you a job at {}.".format(job.address or "an address"),
+            data={"job_id": job.id, "address": job.address, "total_price": job.total_price},
+        ),
+        # Notify customer
+        Notification(
+            id=generate_uuid(),
+            user_id=job.customer_id,
+            type="job_update",
+            title="Driver Assigned",
+            body="A driver has been assigned to your job.",
+            data={"job_id": job.id, "status": "assigned"},
+        ),
+    ])
+    # Read before commit() expires the loaded rows
+    job_dict = job.to_dict()
     driver_name = contractor.user.name if contractor.user else None
-    try:
-        from notifications import (
-            send_driver_assigned_email, send_driver_assigned_sms, send_push_notification,
-        )
-        customer = db.session.get(User, job.customer_id)
-        if customer:
-            if customer.email:
-                send_driver_assigned_email(customer.email, customer.name, driver_name, job.address)
-            if customer.phone:
-                send_driver_assigned_sms(customer.phone, driver_name, job.address)
-        # Push to driver: new job assigned
-        send_push_notification(
-            contractor.user_id, "New Job Assigned",
-            "New job assigned: {}".format(job.address or "an address"),
-            {"job_id": job.id},
-        )
-    except Exception as e:
-        import logging as _log
-        _log.getLogger(__name__).exception("Notification failed for job %s: %s", job.id, e)
+    driver_info = {
+        "id": contractor_id,
+        "name": driver_name,
+        "truck_type": contractor.truck_type,
+        "avg_rating": contractor.avg_rating,
+        "total_jobs": contractor.total_jobs,
+    }
+    db.session.commit()
 
-    # Broadcast via SocketIO
-    from socket_events import broadcast_job_status, socketio
-    broadcast_job_status(job.id, job.status, {"driver_id": contractor.id})
+    # Broadcast via SocketIO (in-process, so inline)
+    broadcast_job_status(job_dict["id"], job_dict["status"], {"driver_id": contractor_id})
 
     socketio.emit("job:assigned", {
-        "job_id": job.id,
-        "contractor_id": contractor.id,
-        "contractor_name": contractor.user.name if contractor.user else None,
-    }, room="driver:{}".format(contractor.id))
+        "job_id": job_dict["id"],
+        "contractor_id": contractor_id,
+        "contractor_name": driver_name,
+    }, room="driver:{}".format(contractor_id))
 
     socketio.emit("job:driver-assigned", {
-        "job_id": job.id,
-        "driver": {
-            "id": contractor.id,
-            "name": contractor.user.name if contractor.user else None,
-            "truck_type": contractor.truck_type,
-            "avg_rating": contractor.avg_rating,
-            "total_jobs": contractor.total_jobs,
-        },
-    }, room=job.id)
+        "job_id": job_dict["id"],
+        "driver": driver_info,
+    }, room=job_dict["id"])
+
+    # Email / SMS / push go out from a worker thread after the response is sent.
+    threading.Thread(
+        target=_dispatch_assign_notifications,
+        args=(current_app._get_current_object(), job_dict["id"], contractor_id),
+        daemon=True,
+    ).start()
+
+    return jsonify({"success": True, "job": job_dict}), 200
+
+
+def _dispatch_assign_notifications(app, job_id, contractor_id):
+    """Email / SMS / push customer and driver about a manual assignment (worker thread)."""
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        contractor = db.session.get(
+            Contractor, contractor_id, options=[joinedload(Contractor.user)]
+        )
+        if not job or not contractor:
+            return
 
-    return jsonify({"success": True, "job": job.to_dict()}), 200
+        customer = db.session.get(User, job.customer_id)
+        driver_name = contractor.user.name if contractor.user else None
+
+        try:
+            from notifications import (
+                send_driver_assigned_email, send_driver_assigned_sms, send_push_notification,
+            )
+            if customer:
+                if customer.email:
+                    send_driver_assigned_email(customer.email, customer.name, driver_name, job.address)
+                if customer.phone:
+                    send_driver_assigned_sms(customer.phone, driver_name, job.address)
+            # Push to driver: new job assigned
+            send_push_notification(
+                contractor.user_id, "New Job Assigned",
+                "New job assigned: {}".format(job.address or "an address"),
+                {"job_id": job.id},
+            )
+        except Exception as e:
+            import logging as _log
+            _log.getLogger(__name__).exception("Notification failed for job %s: %s", job.id, e)
 
 
 @admin_bp.route("/jobs/<job_id>/cancel", methods=["PUT"])
 @require_admin
 def admin_cancel_job(user_id, job_id):
     """Admin cancels a job regardless of ownership."""
-    job = db.session.get(Job, job_id)
-    if not job:
-        return jsonify({"error": "Job not found"}), 404
-
-    if job.status in ("completed", "cancelled"):
+    # The status precondition is enforced by the UPDATE itself; only when no
+    # row matched do we look the job up to tell "missing" from "too late".
+    job = db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status.notin_(("completed", "cancelled")))
+        .values(status="cancelled", updated_at=utcnow())
+        .returning(Job)
+    ).scalar_one_or_none()
+
+    if job is None:
+        db.session.rollback()
+        exists = db.session.execute(
+            select(Job.id).where(Job.id == job_id)
+        ).first()
+        if not exists:
+            return jsonify({"error": "Job not found"}), 404
         return jsonify({"error": "Job cannot be cancelled in its current status"}), 409
 
-    job.status = "cancelled"
-    job.updated_at = utcnow()
+    job_data = job.to_dict()
     db.session.commit()
 
     from socket_events import broadcast_job_status
-    broadcast_job_status(job.id, "cancelled", {})
+    broadcast_job_status(job_id, "cancelled", {})
 
-    return jsonify({"success": True, "job": job.to_dict()}), 200
+    return jsonify({"success": True, "job": job_data}), 200
 
 
 @admin_bp.route("/notifications", methods=["GET"])
@@ -752,22 +914,23 @@ def list_admin_notifications(user_id):
     limit = request.args.get("limit", 20, type=int)
     include_read = request.args.get("include_read", "false").lower() == "true"
 
-    query = Notification.query.filter_by(user_id=user_id)
+    # The unread total rides along on every row as a window aggregate, which
+    # is evaluated before LIMIT -- one round-trip instead of list + COUNT.
+    stmt = select(
+        Notification,
+        func.count().filter(Notification.is_read == False).over().label("unread_count"),
+    ).where(Notification.user_id == user_id)
     if not include_read:
-        query = query.filter_by(is_read=False)
+        stmt = stmt.where(Notification.is_read == False)
 
-    notifications = (
-        query.order_by(Notification.created_at.desc())
-        .limit(limit)
-        .all()
-    )
-
-    unread_count = Notification.query.filter_by(user_id=user_id, is_read=False).count()
+    rows = db.session.execute(
+        stmt.order_by(Notification.created_at.desc()).limit(limit)
+    ).all()
 
     return jsonify({
         "success": True,
-        "notifications": [n.to_dict() for n in notifications],
-        "unread_count": unread_count,
+        "notifications": [row.Notification.to_dict() for row in rows],
+        "unread_count": rows[0].unread_count if rows else 0,
     }), 200
 
 
@@ -789,10 +952,16 @@ def mark_admin_notification_read(user_id, notification_id):
 @require_admin
 def mark_all_admin_notifications_read(user_id):
     """Mark all notifications for this admin as read."""
-    Notification.query.filter_by(user_id=user_id, is_read=False).update({"is_read": True})
-    db.session.commit()
+    updated = Notification.query.filter_by(user_id=user_id, is_read=False).update(
+        {"is_read": True}, synchronize_session=False
+    )
+    # Polling with nothing unread is the common case -- skip the commit.
+    if updated:
+        db.session.commit()
+    else:
+        db.session.rollback()
 
-    return jsonify({"success": True}), 200
+    return jsonify({"success": True, "updated": updated}), 200
 
 
 # ---------------------------------------------------------------------------
@@ -841,69 +1010,42 @@ def list_payments(user_id):
     per_page = request.args.get("per_page", 50, type=int)
     status_filter = request.args.get("status")  # e.g. 'succeeded', 'pending'
 
-    query = Payment.query
+    stmt = (
+        select(*_PAYMENT_LIST_COLUMNS)
+        .join(Job, Job.id == Payment.job_id, isouter=True)
+        .join(_DriverContractor, _DriverContractor.id == Job.driver_id, isouter=True)
+        .join(_DriverUser, _DriverUser.id == _DriverContractor.user_id, isouter=True)
+        .join(_OperatorContractor, _OperatorContractor.id == Job.operator_id, isouter=True)
+        .join(_OperatorUser, _OperatorUser.id == _OperatorContractor.user_id, isouter=True)
+        .join(_Customer, _Customer.id == Job.customer_id, isouter=True)
+    )
     if status_filter:
-        query = query.filter_by(payment_status=status_filter)
+        stmt = stmt.where(Payment.payment_status == status_filter)
 
-    pagination = query.order_by(Payment.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    rows, total, page, pages = _paginate_rows(
+        stmt.order_by(Payment.created_at.desc()), page, per_page
     )
 
     # Aggregate totals across ALL matching payments (not just this page)
-    agg = db.session.query(
-        func.coalesce(func.sum(Payment.amount), 0.0),
-        func.coalesce(func.sum(Payment.commission), 0.0),
-        func.coalesce(func.sum(Payment.driver_payout_amount), 0.0),
-        func.coalesce(func.sum(Payment.operator_payout_amount), 0.0),
+    totals_stmt = select(
+        _money_sum(Payment.amount).label("total_revenue"),
+        _money_sum(Payment.commission).label("total_commission"),
+        _money_sum(Payment.driver_payout_amount).label("total_driver_payouts"),
+        _money_sum(Payment.operator_payout_amount).label("total_operator_payouts"),
     )
     if status_filter:
-        agg = agg.filter(Payment.payment_status == status_filter)
-    agg_row = agg.one()
-
-    payments = []
-    for p in pagination.items:
-        job = p.job
-        driver_name = None
-        operator_name = None
-
-        if job:
-            # Driver name
-            if job.driver and job.driver.user:
-                driver_name = job.driver.user.name
-            # Operator name
-            if job.operator_rel and job.operator_rel.user:
-                operator_name = job.operator_rel.user.name
-
-        payments.append({
-            "id": p.id,
-            "job_id": p.job_id,
-            "amount": p.amount,
-            "commission": p.commission,
-            "driver_payout_amount": p.driver_payout_amount,
-            "operator_payout_amount": p.operator_payout_amount or 0.0,
-            "payout_status": p.payout_status,
-            "payment_status": p.payment_status,
-            "tip_amount": p.tip_amount,
-            "created_at": p.created_at.isoformat() if p.created_at else None,
-            "job_address": job.address if job else None,
-            "job_status": job.status if job else None,
-            "driver_name": driver_name,
-            "operator_name": operator_name,
-            "customer_name": job.customer.name if job and job.customer else None,
-        })
+        totals_stmt = totals_stmt.where(Payment.payment_status == status_filter)
+    totals = db.session.execute(totals_stmt).mappings().one()
 
+    # Rows already carry exactly the response fields; the JSON provider
+    # serializes the row mappings directly.
     return jsonify({
         "success": True,
-        "payments": payments,
-        "totals": {
-            "total_revenue": round(float(agg_row[0]), 2),
-            "total_commission": round(float(agg_row[1]), 2),
-            "total_driver_payouts": round(float(agg_row[2]), 2),
-            "total_operator_payouts": round(float(agg_row[3]), 2),
-        },
-        "total": pagination.total,
-        "page": pagination.page,
-        "pages": pagination.pages,
+        "payments": rows,
+        "totals": dict(totals),
+        "total": total,
+        "page": page,
+        "pages": pages,
     }), 200
 
 
@@ -911,15 +1053,96 @@ def list_payments(user_id):
 # Pricing Config (admin-overridable pricing settings)
 # ---------------------------------------------------------------------------
 
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _number_between(lo, hi=None):
+    def check(value):
+        if not _is_number(value) or value < lo or (hi is not None and value > hi):
+            if hi is None:
+                return "must be a number >= {}".format(lo)
+            return "must be a number between {} and {}".format(lo, hi)
+        return None
+    return check
+
+
+def _check_discount_tiers(value):
+    if not isinstance(value, list):
+        return "must be a list of tiers"
+    for i, tier in enumerate(value):
+        if not isinstance(tier, dict):
+            return "tier {} must be an object".format(i)
+        min_qty = tier.get("min_qty")
+        max_qty = tier.get("max_qty")
+        if not isinstance(min_qty, int) or isinstance(min_qty, bool) or min_qty < 0:
+            return "tier {}: min_qty must be a non-negative integer".format(i)
+        if max_qty is not None and (
+            not isinstance(max_qty, int) or isinstance(max_qty, bool) or max_qty < min_qty
+        ):
+            return "tier {}: max_qty must be null or an integer >= min_qty".format(i)
+        if _number_between(0, 1)(tier.get("discount_rate")):
+            return "tier {}: discount_rate must be a number between 0 and 1".format(i)
+    return None
+
+
+# Built once at import: key -> validator returning an error message or None.
+# A null value is always accepted and means "use the built-in default".
+PRICING_CONFIG_SCHEMA = {
+    "minimum_job_price": _number_between(0),
+    "volume_discount_tiers": _check_discount_tiers,
+    "same_day_surge": _number_between(0),
+    "next_day_surge": _number_between(0),
+    "weekend_surge": _number_between(0),
+    "service_fee_rate": _number_between(0, 1),
+}
+
+
+def _validate_pricing_config(config_data):
+    """Return the allowed subset of *config_data*, or raise ValueError."""
+    cleaned = {}
+    for key, value in config_data.items():
+        check = PRICING_CONFIG_SCHEMA.get(key)
+        if check is None:
+            continue
+        if value is not None:
+            error = check(value)
+            if error:
+                raise ValueError("{} {}".format(key, error))
+        cleaned[key] = value
+    return cleaned
+
+
 @admin_bp.route("/pricing/config", methods=["GET"])
 @require_admin
 def get_pricing_config(user_id):
-    """Return all pricing config overrides."""
-    configs = PricingConfig.query.all()
-    return jsonify({
+    """Return all pricing config overrides.
+
+    The response carries an ETag over the payload and ``no-cache``, so
+    clients revalidate every time with If-None-Match and get a bodyless 304
+    while the config is unchanged.
+    """
+    rows = db.session.execute(
+        select(PricingConfig.key, PricingConfig.value)
+        .where(PricingConfig.key != PRICING_CONFIG_VERSION_KEY)
+        .order_by(PricingConfig.key)
+    ).all()
+    payload = {
         "success": True,
-        "config": {c.key: c.value for c in configs},
-    }), 200
+        "config": dict(rows),
+    }
+    etag = hashlib.md5(current_app.json.dumps(payload).encode("utf-8")).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    # Always revalidate: the admin reading this is the one editing it, so a
+    # cached copy must never outlive their own PUT (the ETag keeps it cheap)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 @admin_bp.route("/pricing/config", methods=["PUT"])
@@ -949,32 +1172,29 @@ def update_pricing_config(user_id):
     if not isinstance(config_data, dict):
         return jsonify({"error": "config must be an object"}), 400
 
-    ALLOWED_KEYS = {
-        "minimum_job_price",
-        "volume_discount_tiers",
-        "same_day_surge",
-        "next_day_surge",
-        "weekend_surge",
-        "service_fee_rate",
-    }
-
-    updated = {}
-    for key, value in config_data.items():
-        if key not in ALLOWED_KEYS:
-            continue
-
-        row = db.session.get(PricingConfig, key)
-        if row:
-            row.value = value
-            row.updated_at = utcnow()
-        else:
-            row = PricingConfig(key=key, value=value)
-            db.session.add(row)
-        updated[key] = value
-
-    db.session.commit()
+    try:
+        config_data = _validate_pricing_config(config_data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if config_data:
+        now = utcnow()
+        rows = [
+            {"key": key, "value": value, "updated_at": now}
+            for key, value in config_data.items()
+        ]
+        # Bump the version row so every worker reloads its cached config
+        rows.append({"key": PRICING_CONFIG_VERSION_KEY, "value": generate_uuid(), "updated_at": now})
+        stmt = _dialect_insert(PricingConfig).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+        )
+        db.session.execute(stmt)
+        db.session.commit()
+        invalidate_pricing_cache()
 
-    return jsonify({"success": True, "config": updated}), 200
+    return jsonify({"success": True, "config": config_data}), 200
 
 
 # ---------------------------------------------------------------------------
@@ -1012,16 +1232,25 @@ def list_reviews(user_id):
     """List all customer reviews with optional rating filter."""
     rating_filter = request.args.get("rating", type=int)
 
-    query = Review.query.order_by(Review.created_at.desc())
+    stmt = (
+        select(
+            Review.id, Review.job_id, Review.customer_id, Review.contractor_id,
+            Review.rating, Review.comment,
+            _Customer.name.label("customer_name"),
+            Review.created_at,
+        )
+        .join(_Customer, _Customer.id == Review.customer_id, isouter=True)
+        .order_by(Review.created_at.desc())
+    )
 
     if rating_filter and 1 <= rating_filter <= 5:
-        query = query.filter_by(rating=rating_filter)
+        stmt = stmt.where(Review.rating == rating_filter)
 
-    reviews = query.limit(200).all()
+    rows = db.session.execute(stmt.limit(200)).mappings().all()
 
     return jsonify({
         "success": True,
-        "reviews": [r.to_dict() for r in reviews],
+        "reviews": rows,
     }), 200
 
 
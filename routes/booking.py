@@ -7,13 +7,20 @@ discounts (4 tiers), time-based surge, zone-based surge, and a minimum
 job price of $89.
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, current_app
 from datetime import datetime, timezone, date as date_type, timedelta
-from math import radians, cos, sin, asin, sqrt
-
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bisect import bisect_right
+from functools import lru_cache
+from math import floor
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from typing import NamedTuple
+
+from sqlalchemy import select, insert
+from sqlalchemy.orm import joinedload
 
 from models import (
     db, User, Job, Payment, PricingRule, PricingConfig, SurgeZone, Contractor,
@@ -21,7 +28,7 @@ from models import (
 )
 from auth_routes import require_auth, optional_auth
 from extensions import limiter
-from geofencing import is_in_service_area
+from geofencing import is_in_service_area, radius_bounding_deltas, within_radius
 
 booking_bp = Blueprint("booking", __name__, url_prefix="/api/booking")
 
@@ -100,7 +107,6 @@ SAME_DAY_SURGE  = 0.25   # +25 %
 NEXT_DAY_SURGE  = 0.10   # +10 %
 WEEKEND_SURGE   = 0.15   # +15 %
 
-EARTH_RADIUS_KM = 6371.0
 NEARBY_CONTRACTOR_RADIUS_KM = 50.0
 
 # Duration estimation constants
@@ -118,21 +124,66 @@ TRUCK_SIZE_THRESHOLDS = [
 # ============================================================================
 # Admin-overridable config loader
 # ============================================================================
+# Reserved PricingConfig row rewritten with a fresh token on every admin
+# update, so workers can tell whether their copy of the config is current.
+PRICING_CONFIG_VERSION_KEY = "_version"
+PRICING_CONFIG_CACHE_TTL = 60  # seconds between version checks
+
+# (recheck_at, version, config, snapshot) -- shared by all requests in this
+# process; snapshot is the PricingSnapshot built from config, or None.
+_pricing_cache = (0.0, None, None, None)
+
+
+def _config_cache():
+    """Return all PricingConfig overrides as a dict, loaded once per request.
+
+    The config is kept in-process and the version row is checked at most
+    every PRICING_CONFIG_CACHE_TTL seconds; the full table is re-read only
+    when the version has changed.  Admin pricing, rule and surge-zone edits
+    bump the version and call :func:`invalidate_pricing_cache`; other workers
+    catch up on the next check.
+    """
+    global _pricing_cache
+    if not hasattr(g, "_pricing_cfg"):
+        recheck_at, cached_version, cfg, snap = _pricing_cache
+        now = time.monotonic()
+        if cfg is None or now >= recheck_at:
+            try:
+                version = db.session.execute(
+                    select(PricingConfig.value)
+                    .where(PricingConfig.key == PRICING_CONFIG_VERSION_KEY)
+                ).scalar()
+                if cfg is None or version != cached_version:
+                    if cfg is not None:
+                        # Surge-zone edits bump the version too
+                        invalidate_surge_zone_cache()
+                    rows = db.session.execute(
+                        select(PricingConfig.key, PricingConfig.value)
+                        .where(PricingConfig.key != PRICING_CONFIG_VERSION_KEY)
+                    ).all()
+                    cfg, snap = dict(rows), None
+                _pricing_cache = (now + PRICING_CONFIG_CACHE_TTL, version, cfg, snap)
+            except Exception:
+                pass  # DB not ready or table missing -- keep what we have
+        g._pricing_cfg = cfg if cfg is not None else {}
+    return g._pricing_cfg
+
+
+def invalidate_pricing_cache():
+    """Drop this process's cached pricing config (call after admin edits)."""
+    global _pricing_cache
+    _pricing_cache = (0.0, None, None, None)
+    invalidate_estimate_cache()
+
+
 def _load_config(key, default):
     """Load a pricing config value from the DB, falling back to *default*."""
-    try:
-        row = db.session.get(PricingConfig, key)
-        if row is not None and row.value is not None:
-            return row.value
-    except Exception:
-        pass  # DB not ready or table missing -- use default
+    value = _config_cache().get(key)
+    if value is not None:
+        return value
     return default
 
 
-def _get_minimum_job_price():
-    return float(_load_config("minimum_job_price", MINIMUM_JOB_PRICE))
-
-
 def _get_volume_discount_tiers():
     """Return volume discount tiers, preferring DB override."""
     raw = _load_config("volume_discount_tiers", None)
@@ -141,21 +192,70 @@ def _get_volume_discount_tiers():
     return VOLUME_DISCOUNT_TIERS
 
 
-def _get_time_surge_rates():
-    """Return (same_day, next_day, weekend) surge rates."""
-    same_day = float(_load_config("same_day_surge", SAME_DAY_SURGE))
-    next_day = float(_load_config("next_day_surge", NEXT_DAY_SURGE))
-    weekend = float(_load_config("weekend_surge", WEEKEND_SURGE))
-    return same_day, next_day, weekend
+class PricingSnapshot(NamedTuple):
+    """Resolved pricing settings, with config overrides already applied."""
+    min_price: float
+    same_day: float
+    next_day: float
+    weekend: float
+    service_fee: float
+    vol_breaks: tuple   # tier min_qty values, ascending
+    vol_uppers: tuple   # matching max_qty values (None = open-ended)
+    vol_rates: tuple    # matching discount rates
 
 
-def _get_service_fee_rate():
-    return float(_load_config("service_fee_rate", SERVICE_FEE_RATE))
+def _pricing_snapshot():
+    """Return the PricingSnapshot for the current config.
+
+    Built once per config load and shared with later requests until the
+    config changes.
+    """
+    global _pricing_cache
+    if not hasattr(g, "_pricing_snap"):
+        cfg = _config_cache()
+        recheck_at, version, cached_cfg, snap = _pricing_cache
+        if snap is None or cached_cfg is not cfg:
+            tiers = sorted(_get_volume_discount_tiers(), key=lambda t: t[0])
+            snap = PricingSnapshot(
+                min_price=float(_load_config("minimum_job_price", MINIMUM_JOB_PRICE)),
+                same_day=float(_load_config("same_day_surge", SAME_DAY_SURGE)),
+                next_day=float(_load_config("next_day_surge", NEXT_DAY_SURGE)),
+                weekend=float(_load_config("weekend_surge", WEEKEND_SURGE)),
+                service_fee=float(_load_config("service_fee_rate", SERVICE_FEE_RATE)),
+                vol_breaks=tuple(lo for lo, _hi, _rate in tiers),
+                vol_uppers=tuple(hi for _lo, hi, _rate in tiers),
+                vol_rates=tuple(float(rate) for _lo, _hi, rate in tiers),
+            )
+            if cached_cfg is cfg:
+                _pricing_cache = (recheck_at, version, cfg, snap)
+        g._pricing_snap = snap
+    return g._pricing_snap
 
 
 # ============================================================================
 # Helpers -- item pricing
 # ============================================================================
+def _pricing_rules_cache():
+    """Return active PricingRule prices keyed by item_type, loaded once per request."""
+    if not hasattr(g, "_pricing_rules"):
+        rows = (
+            db.session.query(PricingRule.item_type, PricingRule.base_price)
+            .filter(PricingRule.is_active == True)
+            .all()
+        )
+        g._pricing_rules = dict(rows)
+    return g._pricing_rules
+
+
+@lru_cache(maxsize=256)
+def _normalize_item_key(category, size):
+    """Return ``(category, size, "category:size" | None)`` normalized for lookups."""
+    cat_lower = (category or "other").lower()
+    size_lower = (size or "").lower().strip()
+    sized_key = "{}:{}".format(cat_lower, size_lower) if size_lower else None
+    return cat_lower, size_lower, sized_key
+
+
 def _get_item_price(category, size=None):
     """Return the unit price for a (category, size) pair.
 
@@ -165,27 +265,36 @@ def _get_item_price(category, size=None):
       2. Hardcoded CATEGORY_PRICES dict (size-aware).
       3. FALLBACK_PRICES flat default.
     """
-    cat_lower = (category or "other").lower()
-    size_lower = (size or "").lower().strip()
+    cat_lower, size_lower, sized_key = _normalize_item_key(category, size)
 
     # --- Try DB rule (size-specific first, then flat category) ---
-    if size_lower:
-        sized_key = "{}:{}".format(cat_lower, size_lower)
-        rule = PricingRule.query.filter(
-            PricingRule.item_type == sized_key,
-            PricingRule.is_active == True,
-        ).first()
-        if rule:
-            return rule.base_price
-
-    rule = PricingRule.query.filter(
-        PricingRule.item_type == cat_lower,
-        PricingRule.is_active == True,
-    ).first()
-    if rule:
-        return rule.base_price
-
-    # --- Hardcoded tier ---
+    rules = _pricing_rules_cache()
+    if sized_key:
+        price = rules.get(sized_key)
+        if price is not None:
+            return price
+
+    price = rules.get(cat_lower)
+    if price is not None:
+        return price
+
+    return _static_item_price(cat_lower, size_lower)
+
+
+def _item_price_map():
+    """Return this request's ``(category, size) -> unit price`` memo.
+
+    Filled lazily by :func:`calculate_estimate`, so each distinct item is
+    resolved through :func:`_get_item_price` once per request.
+    """
+    if not hasattr(g, "_item_prices"):
+        g._item_prices = {}
+    return g._item_prices
+
+
+@lru_cache(maxsize=128)
+def _static_item_price(cat_lower, size_lower):
+    """Resolve a price from the hardcoded CATEGORY_PRICES / FALLBACK_PRICES tables."""
     cat_prices = CATEGORY_PRICES.get(cat_lower)
     if cat_prices:
         if size_lower and size_lower in cat_prices:
@@ -198,23 +307,26 @@ def _get_item_price(category, size=None):
 # ============================================================================
 # Helpers -- volume discount
 # ============================================================================
-def _volume_discount_rate(total_quantity):
+def _volume_discount_rate(total_quantity, snap=None):
     """Return the discount rate based on total item quantity.
 
     Reads from admin-overridable config first, then falls back to defaults.
     """
-    tiers = _get_volume_discount_tiers()
-    for lo, hi, rate in tiers:
-        if hi is None and total_quantity >= lo:
-            return rate
-        if hi is not None and lo <= total_quantity <= hi:
-            return rate
-    return 0.0
-
-
-def _volume_discount_label(total_quantity):
+    if snap is None:
+        snap = _pricing_snapshot()
+    i = bisect_right(snap.vol_breaks, total_quantity) - 1
+    if i < 0:
+        return 0.0
+    upper = snap.vol_uppers[i]
+    if upper is not None and total_quantity > upper:
+        return 0.0  # falls in a gap between configured tiers
+    return snap.vol_rates[i]
+
+
+def _volume_discount_label(total_quantity, rate=None):
     """Human-readable label for the discount tier that applies."""
-    rate = _volume_discount_rate(total_quantity)
+    if rate is None:
+        rate = _volume_discount_rate(total_quantity)
     if rate <= 0:
         return None
     pct = int(rate * 100)
@@ -224,24 +336,77 @@ def _volume_discount_label(total_quantity):
 # ============================================================================
 # Helpers -- zone-based surge (existing behaviour)
 # ============================================================================
+SURGE_ZONE_CACHE_TTL = 60  # seconds
+
+# (expires_at, zones) -- shared by all requests in this process
+_surge_zone_cache = (0.0, ())
+
+
+def _active_surge_zones():
+    """Return active surge zones as ``(multiplier, days, start, end)`` tuples.
+
+    ``start``/``end`` are minutes past midnight (or None when unbounded).
+
+    The table is tiny and rarely edited, so the result is kept in-process for
+    SURGE_ZONE_CACHE_TTL seconds.  Admin edits call
+    :func:`invalidate_surge_zone_cache` and bump the pricing config version;
+    other workers catch up on their next version check or on expiry.
+    """
+    global _surge_zone_cache
+    expires_at, zones = _surge_zone_cache
+    now = time.monotonic()
+    if now >= expires_at:
+        zones = tuple(
+            (multiplier or 1.0, days_of_week,
+             _minutes_of_day(start_time), _minutes_of_day(end_time))
+            for multiplier, days_of_week, start_time, end_time in (
+                db.session.query(
+                    SurgeZone.surge_multiplier, SurgeZone.days_of_week,
+                    SurgeZone.start_time, SurgeZone.end_time,
+                )
+                .filter(SurgeZone.is_active == True)
+                .all()
+            )
+        )
+        _surge_zone_cache = (now + SURGE_ZONE_CACHE_TTL, zones)
+    return zones
+
+
+def _minutes_of_day(hhmm):
+    """Convert an ``HH:MM`` string to minutes past midnight (None if unset)."""
+    if not hhmm:
+        return None
+    try:
+        hours, minutes = hhmm.split(":", 1)
+        return int(hours) * 60 + int(minutes[:2])
+    except (ValueError, AttributeError):
+        return None
+
+
+def invalidate_surge_zone_cache():
+    """Drop the cached surge zones so the next pricing call reloads them."""
+    global _surge_zone_cache
+    _surge_zone_cache = (0.0, ())
+    invalidate_estimate_cache()
+
+
 def _active_surge_multiplier(lat=None, lng=None):
     """Return the highest active surge multiplier that applies right now."""
     now = datetime.now(timezone.utc)
     current_day = now.weekday()
-    current_time = now.strftime("%H:%M")
+    current_min = now.hour * 60 + now.minute
 
-    zones = SurgeZone.query.filter_by(is_active=True).all()
     max_surge = 1.0
 
-    for zone in zones:
-        if zone.days_of_week and current_day not in zone.days_of_week:
+    for surge_multiplier, days_of_week, start_min, end_min in _active_surge_zones():
+        if days_of_week and current_day not in days_of_week:
             continue
-        if zone.start_time and current_time < zone.start_time:
+        if start_min is not None and current_min < start_min:
             continue
-        if zone.end_time and current_time > zone.end_time:
+        if end_min is not None and current_min > end_min:
             continue
-        if zone.surge_multiplier > max_surge:
-            max_surge = zone.surge_multiplier
+        if surge_multiplier > max_surge:
+            max_surge = surge_multiplier
 
     return max_surge
 
@@ -249,7 +414,7 @@ def _active_surge_multiplier(lat=None, lng=None):
 # ============================================================================
 # Helpers -- time-based surge (new)
 # ============================================================================
-def _time_based_surge(scheduled_date_str):
+def _time_based_surge(scheduled_date_str, snap=None):
     """Compute additive surge percentage and a human-readable reason list
     based on the *scheduled pickup date* relative to today (UTC).
 
@@ -260,7 +425,7 @@ def _time_based_surge(scheduled_date_str):
 
     try:
         if isinstance(scheduled_date_str, str):
-            sched = datetime.strptime(scheduled_date_str[:10], "%Y-%m-%d").date()
+            sched = _parse_date(scheduled_date_str[:10])
         elif isinstance(scheduled_date_str, datetime):
             sched = scheduled_date_str.date()
         elif isinstance(scheduled_date_str, date_type):
@@ -271,9 +436,46 @@ def _time_based_surge(scheduled_date_str):
         return 0.0, []
 
     today = datetime.now(timezone.utc).date()
-    delta_days = (sched - today).days
+    if snap is None:
+        snap = _pricing_snapshot()
+    surge, reasons = _time_surge_for(
+        sched, today, (snap.same_day, snap.next_day, snap.weekend),
+    )
+    return surge, list(reasons)
+
+
+def _parse_date(value):
+    """Parse ``YYYY-MM-DD`` (fast path), tolerating unpadded months/days."""
+    try:
+        return date_type.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").date()
 
-    same_day_rate, next_day_rate, weekend_rate = _get_time_surge_rates()
+
+def _parse_scheduled_at(date_str, time_str):
+    """Parse ``YYYY-MM-DD`` + ``HH:MM`` into an aware UTC datetime.
+
+    Same inputs as ``strptime(..., "%Y-%m-%d %H:%M")`` (unpadded fields
+    allowed, digits only) without going through the format-string engine.
+    Raises ValueError on anything else.
+    """
+    year, month, day = date_str.split("-")
+    hour, minute = time_str.split(":")
+    # int() alone would also take signs, underscores and padding
+    if not (len(year) == 4 and year.isdigit()) or not all(
+        f.isdigit() and len(f) <= 2 for f in (month, day, hour, minute)
+    ):
+        raise ValueError("malformed date/time: %r %r" % (date_str, time_str))
+    return datetime(
+        int(year), int(month), int(day), int(hour), int(minute), tzinfo=timezone.utc,
+    )
+
+
+@lru_cache(maxsize=1024)
+def _time_surge_for(sched, today, rates):
+    """Memoized surge for a pickup date; returns ``(surge_pct, reasons_tuple)``."""
+    same_day_rate, next_day_rate, weekend_rate = rates
+    delta_days = (sched - today).days
 
     surge = 0.0
     reasons = []
@@ -292,12 +494,26 @@ def _time_based_surge(scheduled_date_str):
         surge += weekend_rate
         reasons.append("Weekend pickup (+{}%)".format(int(weekend_rate * 100)))
 
-    return surge, reasons
+    return surge, tuple(reasons)
 
 
 # ============================================================================
 # Helpers -- duration & truck size
 # ============================================================================
+def _round_cents(cents):
+    """Round a non-negative fractional cent amount half-up to a whole cent.
+
+    The small epsilon absorbs float error such as ``136470 * 0.15`` giving
+    ``20470.499999999996`` for an exact half cent.
+    """
+    return floor(cents + 0.5 + 1e-6)
+
+
+def _to_cents(amount):
+    """Convert a dollar amount to whole cents."""
+    return _round_cents(amount * 100)
+
+
 def _estimate_duration(total_quantity):
     """Estimate job duration in minutes."""
     return BASE_DURATION_MINUTES + (total_quantity * MINUTES_PER_ITEM)
@@ -332,80 +548,91 @@ def calculate_estimate(items, scheduled_date=None, lat=None, lng=None):
     -------
     dict with detailed pricing breakdown.
     """
-    item_total = 0.0
+    # All config the pipeline needs, resolved once up front
+    snap = _pricing_snapshot()
+    prices = _item_price_map()
+
+    # Pass 1: pull (category, size, quantity) out of the request JSON,
+    # dropping zero/negative quantities, then resolve unit prices.
+    lines = [
+        (entry.get("category") or "other", entry.get("size"), int(entry.get("quantity", 1)))
+        for entry in items
+    ]
+    lines = [line for line in lines if line[2] > 0]
+    unit_prices = []
+    for category, size, _qty in lines:
+        unit_price = prices.get((category, size))
+        if unit_price is None:
+            unit_price = prices[(category, size)] = _get_item_price(category, size)
+        unit_prices.append(unit_price)
+
+    # Pass 2: integer-cent arithmetic, accumulated while the breakdown is
+    # built.  Every money value is rounded to cents once, where it is
+    # produced; the JSON edge divides by 100.
+    item_cents = 0
     total_quantity = 0
     item_breakdown = []
-
-    for entry in items:
-        category = entry.get("category") or "other"
-        quantity = int(entry.get("quantity", 1))
-        size = entry.get("size")  # optional
-        if quantity <= 0:
-            continue
-
-        unit_price = _get_item_price(category, size)
-        line_total = unit_price * quantity
-        item_total += line_total
+    for (category, size, quantity), unit_price in zip(lines, unit_prices):
+        unit = _to_cents(unit_price)
+        line_total = unit * quantity
+        item_cents += line_total
         total_quantity += quantity
-
         line = {
             "category": category,
             "quantity": quantity,
-            "unit_price": round(unit_price, 2),
-            "line_total": round(line_total, 2),
+            "unit_price": unit / 100,
+            "line_total": line_total / 100,
         }
         if size:
             line["size"] = size
         item_breakdown.append(line)
 
     # --- Volume discount ---
-    discount_rate = _volume_discount_rate(total_quantity)
-    volume_discount = round(item_total * discount_rate, 2)
-    volume_discount_label = _volume_discount_label(total_quantity)
+    discount_rate = _volume_discount_rate(total_quantity, snap)
+    discount_cents = _round_cents(item_cents * discount_rate)
+    volume_discount_label = _volume_discount_label(total_quantity, discount_rate)
 
-    items_subtotal = round(item_total - volume_discount, 2)
+    subtotal_cents = item_cents - discount_cents
 
     # --- Zone-based surge multiplier ---
     zone_surge = _active_surge_multiplier(lat, lng)
 
     # --- Time-based surge ---
-    time_surge_pct, surge_reasons = _time_based_surge(scheduled_date)
+    time_surge_pct, surge_reasons = _time_based_surge(scheduled_date, snap)
 
     # Combined: zone multiplier is multiplicative, time surge is additive on top
     combined_multiplier = zone_surge * (1.0 + time_surge_pct)
 
-    surged_subtotal = round(items_subtotal * combined_multiplier, 2)
-    surge_amount = round(surged_subtotal - items_subtotal, 2)
+    surged_cents = _round_cents(subtotal_cents * combined_multiplier)
 
     if zone_surge > 1.0:
         surge_reasons.insert(0, "High-demand zone (x{})".format(round(zone_surge, 2)))
 
     # --- Service fee (admin-overridable) ---
-    fee_rate = _get_service_fee_rate()
-    service_fee = round(surged_subtotal * fee_rate, 2)
+    fee_cents = _round_cents(surged_cents * snap.service_fee)
 
     # --- Total (with minimum floor, admin-overridable) ---
-    min_price = _get_minimum_job_price()
-    raw_total = round(surged_subtotal + service_fee, 2)
-    total = max(raw_total, min_price)
-    minimum_applied = total > raw_total
+    min_price = snap.min_price
+    raw_total_cents = surged_cents + fee_cents
+    total_cents = max(raw_total_cents, _to_cents(min_price))
+    minimum_applied = total_cents > raw_total_cents
 
     # --- Duration & truck size ---
     estimated_duration = _estimate_duration(total_quantity)
     truck_size = _estimate_truck_size(total_quantity)
 
     return {
-        "items_subtotal": round(item_total, 2),
+        "items_subtotal": item_cents / 100,
         "items": item_breakdown,
-        "volume_discount": volume_discount,
+        "volume_discount": discount_cents / 100,
         "volume_discount_rate": discount_rate,
         "volume_discount_label": volume_discount_label,
         "surge_multiplier": round(combined_multiplier, 4),
-        "surge_amount": surge_amount,
+        "surge_amount": (surged_cents - subtotal_cents) / 100,
         "surge_reasons": surge_reasons,
-        "base_price": round(items_subtotal, 2),
-        "service_fee": service_fee,
-        "total": total,
+        "base_price": subtotal_cents / 100,
+        "service_fee": fee_cents / 100,
+        "total": total_cents / 100,
         "minimum_applied": minimum_applied,
         "minimum_job_price": min_price,
         "estimated_duration": estimated_duration,
@@ -414,13 +641,156 @@ def calculate_estimate(items, scheduled_date=None, lat=None, lng=None):
     }
 
 
-def _haversine(lat1, lng1, lat2, lng2):
-    """Return distance in kilometres between two GPS points."""
-    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-    dlat = lat2 - lat1
-    dlng = lng2 - lng1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlng / 2) ** 2
-    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+# ============================================================================
+# Helpers -- signed estimates
+# ============================================================================
+# Seconds a signed estimate stays valid for create_booking
+ESTIMATE_SIG_TTL = 300
+
+# Estimate fields create_booking needs; the signature carries only these
+_SIGNED_ESTIMATE_FIELDS = (
+    "items_subtotal", "base_price", "service_fee", "surge_multiplier", "total",
+)
+
+
+def _estimate_inputs(items, scheduled_date, lat, lng, ndigits=6):
+    """Return canonical, JSON-ready estimate inputs, or None if unkeyable.
+
+    Covers the normalized item lines, the pickup date, the location rounded
+    to *ndigits*, today's date (same-/next-day surge) and the pricing config
+    version.
+    """
+    try:
+        lines = [
+            [entry.get("category") or "other", entry.get("size"), int(entry.get("quantity", 1))]
+            for entry in items
+        ]
+        if isinstance(scheduled_date, datetime):
+            sched = scheduled_date.date().isoformat()
+        elif scheduled_date:
+            sched = _parse_date(scheduled_date[:10]).isoformat()
+        else:
+            sched = None
+        coords = [
+            round(float(v), ndigits) if v is not None else None for v in (lat, lng)
+        ]
+    except (AttributeError, TypeError, ValueError):
+        return None
+    _config_cache()  # make sure the version below is the one we priced with
+    return [
+        [line for line in lines if line[2] > 0], sched, coords,
+        datetime.now(timezone.utc).date().isoformat(), _pricing_cache[1],
+    ]
+
+
+def _estimate_inputs_digest(items, scheduled_date, lat, lng):
+    """Hash the exact estimate inputs, so a signature is only accepted for
+    the quote it was issued for."""
+    inputs = _estimate_inputs(items, scheduled_date, lat, lng)
+    if inputs is None:
+        return None
+    return hashlib.sha256(current_app.json.dumps(inputs).encode("utf-8")).hexdigest()
+
+
+def _estimate_signature(body):
+    return hmac.new(
+        current_app.config["SECRET_KEY"].encode("utf-8"), body, hashlib.sha256,
+    ).hexdigest()
+
+
+def _sign_estimate(result, inputs_digest):
+    """Return ``(token, exp)`` vouching for *result*'s amounts until *exp*."""
+    exp = int(time.time()) + ESTIMATE_SIG_TTL
+    payload = {field: result[field] for field in _SIGNED_ESTIMATE_FIELDS}
+    payload["exp"] = exp
+    payload["in"] = inputs_digest
+    body = base64.urlsafe_b64encode(current_app.json.dumps(payload).encode("utf-8"))
+    return "{}.{}".format(body.decode("ascii"), _estimate_signature(body)), exp
+
+
+def _verify_estimate(token, inputs_digest):
+    """Return the signed amounts if *token* is valid for these inputs, else None."""
+    if not token or not inputs_digest or not isinstance(token, str):
+        return None
+    body, _, sig = token.partition(".")
+    body = body.encode("ascii", "replace")
+    expected = _estimate_signature(body).encode("ascii")
+    if not hmac.compare_digest(sig.encode("ascii", "replace"), expected):
+        return None
+    try:
+        payload = current_app.json.loads(base64.urlsafe_b64decode(body))
+    except ValueError:
+        return None
+    if payload.get("in") != inputs_digest or payload.get("exp", 0) < time.time():
+        return None
+    return payload
+
+
+# ============================================================================
+# Helpers -- estimate response cache
+# ============================================================================
+ESTIMATE_CACHE_TTL = 60     # seconds
+ESTIMATE_CACHE_MAX = 2048   # entries per process
+ESTIMATE_CACHE_NDIGITS = 3  # lat/lng rounding (~100 m) for cache keys
+
+# key -> (expires_at, unsigned estimate) -- shared by all requests in this process
+_estimate_cache = {}
+
+
+def _estimate_cache_key(items, scheduled_date, lat, lng):
+    """Return the cache key for an /estimate request, or None if unkeyable.
+
+    The location is bucketed so small address drift still hits; the config
+    version and today's date are part of the inputs, so config edits and
+    the date rolling over start a fresh key.
+    """
+    inputs = _estimate_inputs(items, scheduled_date, lat, lng, ESTIMATE_CACHE_NDIGITS)
+    if inputs is None:
+        return None
+    return hashlib.blake2b(
+        current_app.json.dumps(inputs).encode("utf-8"), digest_size=16,
+    ).hexdigest()
+
+
+def _cached_estimate(key):
+    entry = _estimate_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, result = entry
+    if time.monotonic() >= expires_at:
+        _estimate_cache.pop(key, None)
+        return None
+    return result
+
+
+def _store_estimate(key, result):
+    now = time.monotonic()
+    if len(_estimate_cache) >= ESTIMATE_CACHE_MAX:
+        for stale in [k for k, (exp, _r) in _estimate_cache.items() if exp <= now]:
+            _estimate_cache.pop(stale, None)
+        if len(_estimate_cache) >= ESTIMATE_CACHE_MAX:
+            _estimate_cache.clear()
+    _estimate_cache[key] = (now + ESTIMATE_CACHE_TTL, result)
+
+
+def invalidate_estimate_cache():
+    """Drop cached /estimate responses (call after pricing edits)."""
+    _estimate_cache.clear()
+
+
+def cached_calculate_estimate(items, scheduled_date=None, lat=None, lng=None):
+    """:func:`calculate_estimate` through the shared estimate cache.
+
+    Returns a fresh dict the caller may modify.
+    """
+    cache_key = _estimate_cache_key(items, scheduled_date, lat, lng)
+    cached = _cached_estimate(cache_key) if cache_key else None
+    if cached is not None:
+        return dict(cached)
+    result = calculate_estimate(items, scheduled_date=scheduled_date, lat=lat, lng=lng)
+    if cache_key:
+        _store_estimate(cache_key, dict(result))
+    return result
 
 
 # ---------------------------------------------------------------------------
@@ -451,11 +821,15 @@ def estimate():
 
     scheduled_date = data.get("scheduledDate") or data.get("scheduled_date")
 
-    result = calculate_estimate(items, scheduled_date=scheduled_date, lat=lat, lng=lng)
-
+    result = cached_calculate_estimate(items, scheduled_date=scheduled_date, lat=lat, lng=lng)
     if result["total_quantity"] == 0:
         return jsonify({"error": "At least one item with a valid category is required"}), 400
 
+    # Signed so create_booking can trust these amounts without re-pricing
+    inputs_digest = _estimate_inputs_digest(items, scheduled_date, lat, lng)
+    if inputs_digest:
+        result["sig"], result["exp"] = _sign_estimate(result, inputs_digest)
+
     return jsonify({
         "success": True,
         "estimate": result,
@@ -481,6 +855,7 @@ def create_booking(user_id):
         scheduled_time: str (HH:MM)
         notes: str (optional)
         estimated_price: float
+        estimate_sig: str (optional, ``sig`` from POST /estimate)
     """
     data = request.get_json()
     if not data:
@@ -540,17 +915,21 @@ def create_booking(user_id):
             scheduled_time = "09:00"
     if scheduled_date:
         try:
-            scheduled_at = datetime.strptime(
-                "{} {}".format(scheduled_date, scheduled_time), "%Y-%m-%d %H:%M"
-            ).replace(tzinfo=timezone.utc)
-        except (ValueError, TypeError):
+            scheduled_at = _parse_scheduled_at(scheduled_date, scheduled_time)
+        except (ValueError, TypeError, AttributeError):
             return jsonify({"error": "Invalid scheduled_date or scheduled_time format"}), 400
 
     photos = data.get("photos", [])
     notes = data.get("notes", "")
 
-    # --- Re-calculate pricing with the v2 engine ---
-    est = calculate_estimate(items, scheduled_date=scheduled_date, lat=lat, lng=lng)
+    # --- Pricing: trust a valid signed estimate, else re-calculate ---
+    est = _verify_estimate(
+        data.get("estimate_sig") or data.get("estimateSig"),
+        _estimate_inputs_digest(items, scheduled_at, lat, lng),
+    )
+    if est is None:
+        # Pass the parsed datetime so the time surge doesn't re-parse the string
+        est = calculate_estimate(items, scheduled_date=scheduled_at, lat=lat, lng=lng)
 
     total = est["total"]
     service_fee = est["service_fee"]
@@ -636,11 +1015,11 @@ def create_booking(user_id):
     )
     db.session.add(payment)
 
-    # --- Notify nearby online contractors ---
-    _notify_nearby_contractors(job)
-
     db.session.commit()
 
+    # --- Notify nearby online contractors (after the response is sent) ---
+    queue_new_job_notifications(job)
+
     return jsonify({
         "success": True,
         "job": job.to_dict(),
@@ -654,7 +1033,12 @@ def create_booking(user_id):
 @booking_bp.route("/<job_id>", methods=["GET"])
 def get_booking_status(job_id):
     """Return full booking status including payment and rating info."""
-    job = db.session.get(Job, job_id)
+    # Spelled out so the single round-trip doesn't depend on mapper defaults
+    job = db.session.execute(
+        select(Job)
+        .options(joinedload(Job.payment), joinedload(Job.rating))
+        .where(Job.id == job_id)
+    ).unique().scalar_one_or_none()
     if not job:
         return jsonify({"error": "Booking not found"}), 404
 
@@ -676,6 +1060,32 @@ def get_booking_status(job_id):
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
+def queue_new_job_notifications(job):
+    """Run :func:`_notify_nearby_contractors` for a committed *job* in the background."""
+    threading.Thread(
+        target=_dispatch_new_job_notifications,
+        args=(current_app._get_current_object(), job.id),
+        daemon=True,
+    ).start()
+
+
+def _dispatch_new_job_notifications(app, job_id):
+    """Background task: notify nearby contractors about a new job."""
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        if not job:
+            return
+        try:
+            _notify_nearby_contractors(job)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            import logging
+            logging.getLogger(__name__).exception(
+                "Failed to notify nearby contractors for job %s", job_id
+            )
+
+
 def _notify_nearby_contractors(job):
     """Create Notification records for nearby online contractors.
 
@@ -683,51 +1093,56 @@ def _notify_nearby_contractors(job):
     """
     # Lazy imports to avoid circular dependencies
     from socket_events import notify_nearby_drivers
-    from notifications import send_push_notification
-
+    from notifications import send_push_to_users
+
+    # Only the columns needed below -- no ORM objects for every online driver
+    stmt = select(
+        Contractor.id, Contractor.user_id,
+        Contractor.current_lat, Contractor.current_lng,
+    ).where(
+        Contractor.is_online == True,
+        Contractor.approval_status == "approved",
+    )
     if job.lat is None or job.lng is None:
         # No location -- notify all online contractors
-        contractors = Contractor.query.filter_by(
-            is_online=True, approval_status="approved"
-        ).all()
+        contractors = db.session.execute(stmt).all()
     else:
-        contractors = Contractor.query.filter_by(
-            is_online=True, approval_status="approved"
-        ).all()
-        contractors = [
-            c for c in contractors
-            if c.current_lat is not None
-            and c.current_lng is not None
-            and _haversine(job.lat, job.lng, c.current_lat, c.current_lng)
-            <= NEARBY_CONTRACTOR_RADIUS_KM
-        ]
+        # Bounding box in SQL (ix_contractors_online_location), exact check here
+        dlat, dlng = radius_bounding_deltas(job.lat, NEARBY_CONTRACTOR_RADIUS_KM)
+        stmt = stmt.where(
+            Contractor.current_lat.between(job.lat - dlat, job.lat + dlat),
+        )
+        if -180.0 <= job.lng - dlng and job.lng + dlng <= 180.0:
+            stmt = stmt.where(
+                Contractor.current_lng.between(job.lng - dlng, job.lng + dlng),
+            )
+        contractors = within_radius(
+            job.lat, job.lng, db.session.execute(stmt).all(), NEARBY_CONTRACTOR_RADIUS_KM,
+        )
 
     # Broadcast Socket.IO event to all nearby drivers (once)
     notify_nearby_drivers(job)
 
-    for contractor in contractors:
-        # Create Notification DB record (in-app notification history)
-        notification = Notification(
-            id=generate_uuid(),
-            user_id=contractor.user_id,
-            type="new_job",
-            title="New Job Available",
-            body="A new junk removal job is available near you.",
-            data={"job_id": job.id, "address": job.address},
-        )
-        db.session.add(notification)
-
-        # Send APNs push notification
-        try:
-            send_push_notification(
-                contractor.user_id,
-                "New Job Nearby",
-                "{} - ${}".format(job.address, int(job.total_price) if job.total_price else 0),
-                {"job_id": job.id, "type": "new_job", "address": job.address}
-            )
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).exception(
-                "Failed to send push notification for job %s to contractor %s: %s",
-                job.id, contractor.id, e
-            )
+    if not contractors:
+        return
+
+    # In-app notification history: one multi-row INSERT for all contractors
+    db.session.execute(insert(Notification), [
+        {
+            "id": generate_uuid(),
+            "user_id": contractor.user_id,
+            "type": "new_job",
+            "title": "New Job Available",
+            "body": "A new junk removal job is available near you.",
+            "data": {"job_id": job.id, "address": job.address},
+        }
+        for contractor in contractors
+    ])
+
+    # APNs push -- device tokens for every contractor are fetched in one query
+    send_push_to_users(
+        [contractor.user_id for contractor in contractors],
+        "New Job Nearby",
+        "{} - ${}".format(job.address, int(job.total_price) if job.total_price else 0),
+        {"job_id": job.id, "type": "new_job", "address": job.address},
+    )
@@ -10,7 +10,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from datetime import datetime, timezone
 
-from models import db, Job, User, Contractor, ChatMessage, generate_uuid, utcnow
+from sqlalchemy import select, update, and_, or_
+
+from models import db, Job, Contractor, ChatMessage, generate_uuid, utcnow
 from auth_routes import require_auth
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/api/jobs")
@@ -20,9 +22,11 @@ def _get_sender_role(user_id, job):
     """Determine whether the authenticated user is 'customer' or 'driver' for this job."""
     if job.customer_id == user_id:
         return "customer"
-    # Check if user is the assigned driver
-    user = db.session.get(User, user_id)
-    if user and user.contractor_profile and job.driver_id == user.contractor_profile.id:
+    if not job.driver_id:
+        return None
+    # Check if user is the assigned driver (a primary-key lookup, no joins)
+    driver = db.session.get(Contractor, job.driver_id)
+    if driver and driver.user_id == user_id:
         return "driver"
     return None
 
@@ -49,13 +53,22 @@ def get_messages(user_id, job_id):
     query = ChatMessage.query.filter_by(job_id=job_id)
 
     if before:
-        cursor_msg = db.session.get(ChatMessage, before)
-        if cursor_msg:
-            query = query.filter(ChatMessage.created_at < cursor_msg.created_at)
+        # Keyset on (created_at, id), resolving the cursor's timestamp inside
+        # the same statement.  An unknown cursor id returns the newest page.
+        cursor_ts = (
+            select(ChatMessage.created_at)
+            .where(ChatMessage.id == before)
+            .scalar_subquery()
+        )
+        query = query.filter(or_(
+            cursor_ts.is_(None),
+            ChatMessage.created_at < cursor_ts,
+            and_(ChatMessage.created_at == cursor_ts, ChatMessage.id < before),
+        ))
 
     messages = (
         query
-        .order_by(ChatMessage.created_at.desc())
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
         .limit(limit)
         .all()
     )
@@ -135,13 +148,21 @@ def mark_messages_read(user_id, job_id):
     other_role = "driver" if role == "customer" else "customer"
     now = utcnow()
 
-    updated = (
-        ChatMessage.query
-        .filter_by(job_id=job_id, sender_role=other_role)
-        .filter(ChatMessage.read_at.is_(None))
-        .update({"read_at": now})
-    )
-    db.session.commit()
+    # One statement marks the rows and reports which ones changed
+    read_ids = db.session.execute(
+        update(ChatMessage)
+        .where(
+            ChatMessage.job_id == job_id,
+            ChatMessage.sender_role == other_role,
+            ChatMessage.read_at.is_(None),
+        )
+        .values(read_at=now)
+        .returning(ChatMessage.id),
+        execution_options={"synchronize_session": False},
+    ).scalars().all()
+    updated = len(read_ids)
+    if updated:
+        db.session.commit()
 
     # Notify the other party via Socket.IO
     try:
@@ -151,6 +172,7 @@ def mark_messages_read(user_id, job_id):
             "read_by": role,
             "read_at": now.isoformat(),
             "count": updated,
+            "message_ids": read_ids,
         }, room=job_id)
     except Exception:
         pass
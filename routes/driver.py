@@ -5,9 +5,11 @@ Provides earnings, payouts, profile, and stats for authenticated drivers.
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
+from functools import lru_cache
+import time
 
-from sqlalchemy import func
+from sqlalchemy import Float, Numeric, and_, bindparam, cast, event, func, inspect, or_, select
+from sqlalchemy.orm import joinedload, load_only, noload
 
 import sys
 import os
@@ -19,6 +21,7 @@ from auth_routes import require_auth
 driver_bp = Blueprint("driver", __name__, url_prefix="/api/driver")
 
 PLATFORM_COMMISSION_RATE = 0.20  # 20% platform commission, 80% to driver
+_COMMISSION_PERCENT = round(PLATFORM_COMMISSION_RATE * 100)
 
 
 def _get_contractor_or_404(user_id):
@@ -26,17 +29,222 @@ def _get_contractor_or_404(user_id):
 
     Returns (contractor, None) on success or (None, error_response) if not found.
     """
-    user = db.session.get(User, user_id)
-    if not user:
-        return None, (jsonify({"error": "User not found"}), 404)
-
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    # One round-trip; contractor.user comes back with it
+    contractor = db.session.execute(
+        select(Contractor)
+        .options(joinedload(Contractor.user))
+        .where(Contractor.user_id == user_id)
+    ).scalars().first()
     if not contractor:
+        # require_auth has already loaded the user, so this is an identity-map hit
+        if not db.session.get(User, user_id):
+            return None, (jsonify({"error": "User not found"}), 404)
         return None, (jsonify({"error": "Driver profile not found"}), 404)
 
     return contractor, None
 
 
+def _payout_sum():
+    """SUM of per-job driver payouts, each rounded to cents, as a float."""
+    payout = func.round(
+        cast(Job.total_price * (1 - PLATFORM_COMMISSION_RATE), Numeric(14, 4)), 2
+    )
+    return cast(func.coalesce(func.sum(payout), 0), Float)
+
+
+def _earnings_buckets(ts, dialect_name):
+    """Return ``(week, month)`` SQL expressions formatting *ts* as bucket keys.
+
+    Weeks start on Monday (``YYYY-MM-DD``); months are ``YYYY-MM``.
+    """
+    if dialect_name == "postgresql":
+        return (
+            func.to_char(func.date_trunc("week", ts), "YYYY-MM-DD"),
+            func.to_char(ts, "YYYY-MM"),
+        )
+    # SQLite: step forward to Sunday (no-op on Sundays), then back to Monday
+    return func.date(ts, "weekday 0", "-6 days"), func.strftime("%Y-%m", ts)
+
+
+@lru_cache(maxsize=1)
+def _period_bounds(today):
+    """Return ``(week_start, month_start)`` as UTC midnights for *today*.
+
+    Weeks start on Monday.  Memoized for the current day.
+    """
+    midnight = datetime(today.year, today.month, today.day, tzinfo=timezone.utc)
+    return midnight - timedelta(days=today.weekday()), midnight.replace(day=1)
+
+
+# ---------------------------------------------------------------------------
+# Prebuilt statements
+# ---------------------------------------------------------------------------
+# Built once at import and executed with bound parameters, so requests skip
+# rebuilding the expression trees and always hit SQLAlchemy's compiled cache.
+_IS_DRIVERS_JOB = Job.driver_id == bindparam("driver_id")
+_IS_COMPLETED = Job.status == "completed"
+_COMPLETED_DT = func.coalesce(Job.completed_at, Job.updated_at, Job.created_at)
+_PAYOUT = Job.total_price * (1 - PLATFORM_COMMISSION_RATE)
+
+_EARNINGS_TOTALS_STMT = select(_payout_sum(), func.count()).where(_IS_DRIVERS_JOB, _IS_COMPLETED)
+
+# Pending payout (succeeded payments on completed jobs, not yet paid out)
+# and the last payout date, in one pass over the driver's payments
+_PAYOUT_STATUS_STMT = (
+    select(
+        func.coalesce(
+            func.sum(Payment.driver_payout_amount).filter(
+                _IS_COMPLETED,
+                Payment.payment_status == "succeeded",
+                Payment.payout_status == "pending",
+            ),
+            0.0,
+        ),
+        func.max(Payment.updated_at).filter(Payment.payout_status == "paid"),
+    )
+    .join(Job, Job.id == Payment.job_id)
+    .where(_IS_DRIVERS_JOB)
+)
+
+# One pass over the driver's jobs with conditional aggregates
+_STATS_STMT = select(
+    func.count(),
+    func.count().filter(_IS_COMPLETED),
+    func.coalesce(func.sum(_PAYOUT).filter(_IS_COMPLETED), 0.0),
+    func.coalesce(
+        func.sum(_PAYOUT).filter(_IS_COMPLETED, Job.completed_at >= bindparam("week_start")), 0.0
+    ),
+    func.coalesce(
+        func.sum(_PAYOUT).filter(_IS_COMPLETED, Job.completed_at >= bindparam("month_start")), 0.0
+    ),
+).where(_IS_DRIVERS_JOB)
+
+_HISTORY_STMT = (
+    select(Job)
+    .options(
+        load_only(Job.id, Job.address, Job.completed_at, Job.total_price, Job.status),
+        noload(Job.payment), noload(Job.rating),
+    )
+    .where(_IS_DRIVERS_JOB, _IS_COMPLETED)
+    .order_by(Job.completed_at.desc().nulls_first(), Job.id.desc())
+)
+
+
+def _history_page_after():
+    """Keyset continuation of _HISTORY_STMT after job ``:before``.
+
+    Keyset on (completed_at, id), resolving the cursor's timestamp inside the
+    same statement.  Jobs without a completed_at sort first; an unknown
+    cursor id is treated like one of those.
+    """
+    before = bindparam("before")
+    cursor_ts = (
+        select(Job.completed_at)
+        .where(Job.id == before, _IS_DRIVERS_JOB)
+        .scalar_subquery()
+    )
+    return _HISTORY_STMT.where(or_(
+        and_(cursor_ts.is_(None), or_(Job.completed_at.isnot(None), Job.id < before)),
+        Job.completed_at < cursor_ts,
+        and_(Job.completed_at == cursor_ts, Job.id < before),
+    ))
+
+
+_HISTORY_AFTER_STMT = _history_page_after()
+_HISTORY_MAX_PER_PAGE = 100  # db.paginate's default max_per_page
+
+
+@lru_cache(maxsize=None)
+def _earnings_bucket_stmts(dialect_name):
+    """Return the ``(weekly, monthly)`` bucket statements for a dialect."""
+    week_key, month_key = _earnings_buckets(_COMPLETED_DT, dialect_name)
+    return tuple(
+        select(key, _payout_sum(), func.count())
+        .where(_IS_DRIVERS_JOB, _IS_COMPLETED, _COMPLETED_DT.isnot(None))
+        .group_by(key)
+        .order_by(key.desc())
+        for key in (week_key, month_key)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Earnings/stats cache
+# ---------------------------------------------------------------------------
+DRIVER_SUMMARY_CACHE_TTL = 60      # seconds
+DRIVER_SUMMARY_CACHE_MAX = 10000   # entries per process
+
+# (endpoint, contractor_id) -> (expires_at, payload) -- shared by all
+# requests in this process.  Job/Payment flushes below drop stale entries;
+# writes that bypass the ORM (Core updates) are covered by the TTL.
+_summary_cache = {}
+
+# Job columns the earnings/stats payloads are computed from
+_SUMMARY_JOB_FIELDS = ("driver_id", "status", "total_price", "completed_at")
+
+
+def _cached_summary(key):
+    entry = _summary_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, payload = entry
+    if time.monotonic() >= expires_at:
+        _summary_cache.pop(key, None)
+        return None
+    return payload
+
+
+def _store_summary(key, payload):
+    if len(_summary_cache) >= DRIVER_SUMMARY_CACHE_MAX:
+        _summary_cache.clear()
+    _summary_cache[key] = (time.monotonic() + DRIVER_SUMMARY_CACHE_TTL, payload)
+
+
+def invalidate_driver_summary(contractor_id=None):
+    """Drop cached earnings/stats for one contractor, or for everyone."""
+    if contractor_id is None:
+        _summary_cache.clear()
+        return
+    _summary_cache.pop(("earnings", contractor_id), None)
+    _summary_cache.pop(("stats", contractor_id), None)
+
+
+@event.listens_for(Job, "after_insert")
+@event.listens_for(Job, "after_delete")
+def _job_added_or_removed(mapper, connection, target):
+    if target.driver_id:
+        invalidate_driver_summary(target.driver_id)
+
+
+@event.listens_for(Job, "after_update")
+def _job_updated(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if not any(attrs[name].history.has_changes() for name in _SUMMARY_JOB_FIELDS):
+        return
+    # A reassigned job changes both the old and the new driver's numbers
+    for driver_id in {target.driver_id, *attrs.driver_id.history.deleted}:
+        if driver_id:
+            invalidate_driver_summary(driver_id)
+
+
+@event.listens_for(Payment, "after_insert")
+@event.listens_for(Payment, "after_update")
+def _payment_changed(mapper, connection, target):
+    # Payout state feeds pending_payout/last_payout_date; payout runs touch
+    # many drivers at once, so just start over.
+    invalidate_driver_summary()
+
+
+_EMPTY_EARNINGS = {
+    "total_earned": 0.0,
+    "total_jobs": 0,
+    "avg_per_job": 0.0,
+    "pending_payout": 0.0,
+    "last_payout_date": None,
+    "weekly": [],
+    "monthly": [],
+}
+
+
 # ---------------------------------------------------------------------------
 # GET /api/driver/earnings
 # ---------------------------------------------------------------------------
@@ -48,95 +256,50 @@ def earnings(user_id):
     if err:
         return err
 
-    try:
-        # All completed jobs for this driver
-        completed_jobs = (
-            Job.query
-            .filter_by(driver_id=contractor.id, status="completed")
-            .all()
-        )
-
-        total_earned = 0.0
-        total_jobs = len(completed_jobs)
-
-        weekly_map = defaultdict(lambda: {"amount": 0.0, "jobs": 0})
-        monthly_map = defaultdict(lambda: {"amount": 0.0, "jobs": 0})
+    cache_key = ("earnings", contractor.id)
+    summary = _cached_summary(cache_key)
+    if summary is not None:
+        return jsonify({"success": True, "earnings": summary}), 200
 
-        for job in completed_jobs:
-            driver_payout = round(job.total_price * (1 - PLATFORM_COMMISSION_RATE), 2)
-            total_earned += driver_payout
+    # total_jobs counts completions, so a driver at 0 has nothing to sum yet;
+    # NULL means unknown, so that falls through to the real queries
+    if contractor.total_jobs == 0:
+        return jsonify({"success": True, "earnings": dict(_EMPTY_EARNINGS)}), 200
 
-            completed_dt = job.completed_at or job.updated_at or job.created_at
-            if completed_dt:
-                # Weekly bucket (ISO week start = Monday)
-                week_start = completed_dt - timedelta(days=completed_dt.weekday())
-                week_key = week_start.strftime("%Y-%m-%d")
-                weekly_map[week_key]["amount"] += driver_payout
-                weekly_map[week_key]["jobs"] += 1
-
-                # Monthly bucket
-                month_key = completed_dt.strftime("%Y-%m")
-                monthly_map[month_key]["amount"] += driver_payout
-                monthly_map[month_key]["jobs"] += 1
+    try:
+        params = {"driver_id": contractor.id}
 
+        total_earned, total_jobs = db.session.execute(_EARNINGS_TOTALS_STMT, params).one()
         total_earned = round(total_earned, 2)
         avg_per_job = round(total_earned / total_jobs, 2) if total_jobs > 0 else 0.0
 
-        # Pending payout: driver_payout_amount from payments where payout_status is pending
-        pending_payout_result = (
-            db.session.query(func.coalesce(func.sum(Payment.driver_payout_amount), 0.0))
-            .join(Job, Job.id == Payment.job_id)
-            .filter(
-                Job.driver_id == contractor.id,
-                Job.status == "completed",
-                Payment.payment_status == "succeeded",
-                Payment.payout_status == "pending",
-            )
-            .scalar()
-        )
-        pending_payout = round(float(pending_payout_result), 2)
-
-        # Last payout date: most recent payment where payout_status is 'paid'
-        last_paid_payment = (
-            Payment.query
-            .join(Job, Job.id == Payment.job_id)
-            .filter(
-                Job.driver_id == contractor.id,
-                Payment.payout_status == "paid",
-            )
-            .order_by(Payment.updated_at.desc())
-            .first()
-        )
-        last_payout_date = None
-        if last_paid_payment and last_paid_payment.updated_at:
-            last_payout_date = last_paid_payment.updated_at.isoformat()
-
-        # Build sorted weekly list (most recent first)
-        weekly = sorted(
-            [{"week": k, "amount": round(v["amount"], 2), "jobs": v["jobs"]} for k, v in weekly_map.items()],
-            key=lambda x: x["week"],
-            reverse=True,
-        )
-
-        # Build sorted monthly list (most recent first)
-        monthly = sorted(
-            [{"month": k, "amount": round(v["amount"], 2), "jobs": v["jobs"]} for k, v in monthly_map.items()],
-            key=lambda x: x["month"],
-            reverse=True,
-        )
+        # Weekly/monthly buckets, aggregated in SQL (most recent first)
+        weekly_stmt, monthly_stmt = _earnings_bucket_stmts(db.engine.dialect.name)
+        weekly = [
+            {"week": week, "amount": round(amount, 2), "jobs": jobs}
+            for week, amount, jobs in db.session.execute(weekly_stmt, params)
+        ]
+        monthly = [
+            {"month": month, "amount": round(amount, 2), "jobs": jobs}
+            for month, amount, jobs in db.session.execute(monthly_stmt, params)
+        ]
+
+        pending_payout, last_payout_at = db.session.execute(_PAYOUT_STATUS_STMT, params).one()
+        pending_payout = round(float(pending_payout), 2)
+        last_payout_date = last_payout_at.isoformat() if last_payout_at else None
+
+        summary = {
+            "total_earned": total_earned,
+            "total_jobs": total_jobs,
+            "avg_per_job": avg_per_job,
+            "pending_payout": pending_payout,
+            "last_payout_date": last_payout_date,
+            "weekly": weekly,
+            "monthly": monthly,
+        }
+        _store_summary(cache_key, summary)
 
-        return jsonify({
-            "success": True,
-            "earnings": {
-                "total_earned": total_earned,
-                "total_jobs": total_jobs,
-                "avg_per_job": avg_per_job,
-                "pending_payout": pending_payout,
-                "last_payout_date": last_payout_date,
-                "weekly": weekly,
-                "monthly": monthly,
-            },
-        }), 200
+        return jsonify({"success": True, "earnings": summary}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -148,7 +311,12 @@ def earnings(user_id):
 @driver_bp.route("/earnings/history", methods=["GET"])
 @require_auth
 def earnings_history(user_id):
-    """Return a paginated list of completed jobs with earnings breakdown."""
+    """Return a paginated list of completed jobs with earnings breakdown.
+
+    Newest first.  Pass ``?before=<job_id>`` (the previous response's
+    ``next_cursor``) for keyset paging, which skips the OFFSET scan and the
+    total count; ``?page=`` still works as before.
+    """
     contractor, err = _get_contractor_or_404(user_id)
     if err:
         return err
@@ -156,35 +324,51 @@ def earnings_history(user_id):
     try:
         page = request.args.get("page", 1, type=int)
         per_page = request.args.get("per_page", 20, type=int)
+        before = request.args.get("before")  # job id for cursor-based pagination
+
+        params = {"driver_id": contractor.id}
+        if before:
+            params["before"] = before
+            # Same bounds db.paginate applies to per_page on the page path
+            limit = min(per_page, _HISTORY_MAX_PER_PAGE) if per_page > 0 else 20
+            items = db.session.execute(
+                _HISTORY_AFTER_STMT.limit(limit + 1), params
+            ).scalars().all()
+            has_next = len(items) > limit
+            items = items[:limit]
+            pagination = None
+        else:
+            pagination = db.paginate(
+                _HISTORY_STMT.params(params), page=page, per_page=per_page, error_out=False,
+            )
+            items = pagination.items
+            has_next = pagination.has_next
 
-        pagination = (
-            Job.query
-            .filter_by(driver_id=contractor.id, status="completed")
-            .order_by(Job.completed_at.desc())
-            .paginate(page=page, per_page=per_page, error_out=False)
-        )
-
+        # Integer cents: one conversion per job, commission rounded half-up
         jobs = []
-        for job in pagination.items:
-            commission = round(job.total_price * PLATFORM_COMMISSION_RATE, 2)
-            driver_payout = round(job.total_price - commission, 2)
+        for job in items:
+            price_cents = int(job.total_price * 100 + 0.5)
+            commission_cents = (price_cents * _COMMISSION_PERCENT + 50) // 100
             jobs.append({
                 "id": job.id,
                 "address": job.address,
                 "completed_at": job.completed_at.isoformat() if job.completed_at else None,
                 "total_price": job.total_price,
-                "commission": commission,
-                "driver_payout": driver_payout,
+                "commission": commission_cents / 100,
+                "driver_payout": (price_cents - commission_cents) / 100,
                 "status": job.status,
             })
 
-        return jsonify({
+        body = {
             "success": True,
             "jobs": jobs,
-            "total": pagination.total,
-            "page": pagination.page,
             "per_page": per_page,
-        }), 200
+            "next_cursor": items[-1].id if has_next and items else None,
+        }
+        if pagination is not None:
+            body["total"] = pagination.total
+            body["page"] = pagination.page
+        return jsonify(body), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -281,72 +465,42 @@ def stats(user_id):
     if err:
         return err
 
-    try:
-        now = utcnow()
+    cache_key = ("stats", contractor.id)
+    summary = _cached_summary(cache_key)
+    if summary is not None:
+        # Rating is read live; it changes without touching jobs
+        return jsonify({"success": True, "stats": dict(summary, rating=contractor.avg_rating)}), 200
 
-        # Total jobs assigned to this driver (any status)
-        total_jobs = Job.query.filter_by(driver_id=contractor.id).count()
-
-        # Completed jobs
-        completed_jobs = Job.query.filter_by(driver_id=contractor.id, status="completed").count()
+    try:
+        week_start, month_start = _period_bounds(utcnow().date())
+
+        total_jobs, completed_jobs, total_earned, this_week_earned, this_month_earned = (
+            db.session.execute(_STATS_STMT, {
+                "driver_id": contractor.id,
+                "week_start": week_start,
+                "month_start": month_start,
+            }).one()
+        )
 
         # Acceptance rate: completed / total (excluding cancelled by customer)
         # For a simple calculation: completed / total assigned
         acceptance_rate = round(completed_jobs / total_jobs, 2) if total_jobs > 0 else 0.0
+        total_earned = round(total_earned, 2)
+        this_week_earned = round(this_week_earned, 2)
+        this_month_earned = round(this_month_earned, 2)
 
-        # Total earned
-        all_completed = (
-            Job.query
-            .filter_by(driver_id=contractor.id, status="completed")
-            .all()
-        )
-        total_earned = round(
-            sum(j.total_price * (1 - PLATFORM_COMMISSION_RATE) for j in all_completed), 2
-        )
-
-        # This week earned (Monday through now)
-        week_start = now - timedelta(days=now.weekday())
-        week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-        this_week_jobs = (
-            Job.query
-            .filter(
-                Job.driver_id == contractor.id,
-                Job.status == "completed",
-                Job.completed_at >= week_start,
-            )
-            .all()
-        )
-        this_week_earned = round(
-            sum(j.total_price * (1 - PLATFORM_COMMISSION_RATE) for j in this_week_jobs), 2
-        )
-
-        # This month earned
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        this_month_jobs = (
-            Job.query
-            .filter(
-                Job.driver_id == contractor.id,
-                Job.status == "completed",
-                Job.completed_at >= month_start,
-            )
-            .all()
-        )
-        this_month_earned = round(
-            sum(j.total_price * (1 - PLATFORM_COMMISSION_RATE) for j in this_month_jobs), 2
-        )
+        summary = {
+            "total_jobs": total_jobs,
+            "completed_jobs": completed_jobs,
+            "rating": contractor.avg_rating,
+            "acceptance_rate": acceptance_rate,
+            "total_earned": total_earned,
+            "this_week_earned": this_week_earned,
+            "this_month_earned": this_month_earned,
+        }
+        _store_summary(cache_key, summary)
 
-        return jsonify({
-            "success": True,
-            "stats": {
-                "total_jobs": total_jobs,
-                "completed_jobs": completed_jobs,
-                "rating": contractor.avg_rating,
-                "acceptance_rate": acceptance_rate,
-                "total_earned": total_earned,
-                "this_week_earned": this_week_earned,
-                "this_month_earned": this_month_earned,
-            },
-        }), 200
+        return jsonify({"success": True, "stats": summary}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
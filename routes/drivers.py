@@ -3,33 +3,83 @@ Driver / Contractor API routes for Umuve.
 Handles contractor registration, availability, location, and job management.
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, current_app
 from datetime import datetime, timezone
-from math import radians, cos, sin, asin, sqrt
 import logging
+import threading
 
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import bindparam, case, or_, select, update
+from sqlalchemy.orm import joinedload, noload
+
 from models import db, User, Contractor, Job, Notification, OperatorInvite, Referral, generate_uuid, utcnow
 from auth_routes import require_auth
+from geofencing import distances_km, radius_bounding_deltas
+from notifications import (
+    send_driver_en_route_email, send_driver_en_route_sms,
+    send_job_completed_email, send_push_notification,
+)
+from socket_events import socketio, broadcast_job_accepted, broadcast_job_status
+from routes.booking import cached_calculate_estimate
+from routes.payments import _auto_assign_driver, _get_stripe
 
 drivers_bp = Blueprint("drivers", __name__, url_prefix="/api/drivers")
 
 logger = logging.getLogger(__name__)
 
-EARTH_RADIUS_KM = 6371.0
 DEFAULT_SEARCH_RADIUS_KM = 30.0
 
+# Jobs any driver may pick up, and a driver's own jobs still in progress.
+# ix_jobs_open_location's partial predicate matches _OPEN_STATUSES.
+_OPEN_STATUSES = ("pending", "confirmed")
+_ACTIVE_STATUSES = ("assigned", "accepted", "en_route", "arrived", "started")
+
+
+# Hot lookups, built once and executed with bound parameters so requests
+# skip rebuilding the statements and always hit the compiled cache
+_CONTRACTOR_BY_USER_STMT = (
+    select(Contractor)
+    .options(joinedload(Contractor.user))
+    .where(Contractor.user_id == bindparam("user_id"))
+    .limit(1)
+)
+_UPDATE_LOCATION_STMT = (
+    update(Contractor)
+    .where(Contractor.user_id == bindparam("uid"))
+    .values(current_lat=bindparam("new_lat"), current_lng=bindparam("new_lng"))
+    .execution_options(synchronize_session=False)
+)
+# Claim one use of an invite code: the usable-invite checks and the
+# increment happen in a single UPDATE, so two registrations racing on the
+# last use cannot both succeed
+_CLAIM_INVITE_STMT = (
+    update(OperatorInvite)
+    .where(
+        OperatorInvite.invite_code == bindparam("code"),
+        OperatorInvite.is_active == True,
+        OperatorInvite.use_count < OperatorInvite.max_uses,
+        or_(OperatorInvite.expires_at.is_(None), OperatorInvite.expires_at >= bindparam("now")),
+    )
+    .values(
+        use_count=OperatorInvite.use_count + 1,
+        is_active=case((OperatorInvite.use_count + 1 >= OperatorInvite.max_uses, False), else_=True),
+    )
+    .returning(OperatorInvite.operator_id)
+)
+
 
-def _haversine(lat1, lng1, lat2, lng2):
-    """Return distance in kilometres between two GPS points."""
-    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-    dlat = lat2 - lat1
-    dlng = lng2 - lng1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlng / 2) ** 2
-    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+def _get_contractor(user_id):
+    """Return the user's Contractor (with its user loaded) or None, once per request."""
+    if not hasattr(g, "_contractors"):
+        g._contractors = {}
+    if user_id not in g._contractors:
+        g._contractors[user_id] = db.session.execute(
+            _CONTRACTOR_BY_USER_STMT, {"user_id": user_id}
+        ).scalar_one_or_none()
+    return g._contractors[user_id]
 
 
 @drivers_bp.route("/register", methods=["POST"])
@@ -67,23 +117,16 @@ def register_contractor(user_id):
 
     # Handle invite code — link contractor to an operator's fleet
     if invite_code and not is_operator:
-        invite = OperatorInvite.query.filter_by(
-            invite_code=invite_code, is_active=True
-        ).first()
-        if invite:
-            now = utcnow()
-            # Ensure both datetimes are tz-aware for comparison
-            invite_exp = invite.expires_at
-            if invite_exp and invite_exp.tzinfo is None:
-                from datetime import timezone as _tz
-                invite_exp = invite_exp.replace(tzinfo=_tz.utc)
-            expired = invite_exp and invite_exp < now
-            maxed = invite.use_count >= invite.max_uses
-            if not expired and not maxed:
-                contractor.operator_id = invite.operator_id
-                invite.use_count += 1
-                if invite.use_count >= invite.max_uses:
-                    invite.is_active = False
+        # expires_at is a naive UTC column, so bind a naive UTC now
+        operator_id = db.session.execute(
+            _CLAIM_INVITE_STMT, {"code": invite_code, "now": utcnow().replace(tzinfo=None)}
+        ).scalar_one_or_none()
+        if operator_id:
+            contractor.operator_id = operator_id
+            Contractor.query.filter_by(id=operator_id).update(
+                {Contractor.fleet_size: Contractor.fleet_size + 1},
+                synchronize_session=False,
+            )
 
     db.session.add(contractor)
     db.session.commit()
@@ -95,7 +138,7 @@ def register_contractor(user_id):
 @require_auth
 def get_profile(user_id):
     """Return the contractor profile for the authenticated user."""
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor profile not found"}), 404
 
@@ -106,7 +149,7 @@ def get_profile(user_id):
 @require_auth
 def update_availability(user_id):
     """Toggle online status and update availability schedule."""
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor profile not found"}), 404
 
@@ -125,10 +168,6 @@ def update_availability(user_id):
 @require_auth
 def update_location(user_id):
     """Update the contractor current GPS coordinates."""
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
-    if not contractor:
-        return jsonify({"error": "Contractor profile not found"}), 404
-
     data = request.get_json() or {}
     lat = data.get("lat")
     lng = data.get("lng")
@@ -137,20 +176,27 @@ def update_location(user_id):
         return jsonify({"error": "lat and lng are required"}), 400
 
     try:
-        contractor.current_lat = float(lat)
-        contractor.current_lng = float(lng)
+        lat, lng = float(lat), float(lng)
     except (TypeError, ValueError):
         return jsonify({"error": "lat and lng must be numbers"}), 400
 
+    # Hot path (drivers ping this constantly): one UPDATE, no contractor load
+    result = db.session.execute(
+        _UPDATE_LOCATION_STMT, {"uid": user_id, "new_lat": lat, "new_lng": lng}
+    )
+    if not result.rowcount:
+        db.session.rollback()
+        return jsonify({"error": "Contractor profile not found"}), 404
+
     db.session.commit()
-    return jsonify({"success": True, "lat": contractor.current_lat, "lng": contractor.current_lng}), 200
+    return jsonify({"success": True, "lat": lat, "lng": lng}), 200
 
 
 @drivers_bp.route("/jobs/available", methods=["GET"])
 @require_auth
 def get_available_jobs(user_id):
     """Return pending jobs near the contractor current location."""
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor profile not found"}), 404
 
@@ -159,31 +205,54 @@ def get_available_jobs(user_id):
 
     radius_km = float(request.args.get("radius", DEFAULT_SEARCH_RADIUS_KM))
 
-    # Include pending jobs + jobs already assigned to this contractor
-    pending_jobs = Job.query.filter(
+    # Include pending jobs + jobs already assigned to this contractor.
+    # to_dict() reads only columns, so skip the joined payment/rating loads.
+    query = Job.query.options(noload(Job.payment), noload(Job.rating)).filter(
         db.or_(
-            Job.status.in_(["pending", "confirmed"]),
+            Job.status.in_(_OPEN_STATUSES),
             db.and_(
                 Job.driver_id == contractor.id,
-                Job.status.in_(["assigned", "accepted", "en_route", "arrived", "started"]),
+                Job.status.in_(_ACTIVE_STATUSES),
             ),
         )
-    ).all()
+    )
+    located = contractor.current_lat is not None and contractor.current_lng is not None
+    if located:
+        # Bounding box in SQL so only candidates reach the haversine below;
+        # jobs without coordinates are still returned (distance unknown)
+        lat0, lng0 = contractor.current_lat, contractor.current_lng
+        dlat, dlng = radius_bounding_deltas(lat0, radius_km)
+        in_box = Job.lat.between(lat0 - dlat, lat0 + dlat)
+        if -180.0 <= lng0 - dlng and lng0 + dlng <= 180.0:
+            in_box = db.and_(in_box, Job.lng.between(lng0 - dlng, lng0 + dlng))
+        query = query.filter(db.or_(Job.lat.is_(None), Job.lng.is_(None), in_box))
+    pending_jobs = query.all()
+
+    if not located:
+        # No location pinged yet (e.g. a new driver): every distance is
+        # unknown, so there is nothing to compute or sort
+        jobs = [dict(job.to_dict(), distance_km=None) for job in pending_jobs]
+        return jsonify({"success": True, "jobs": jobs}), 200
+
+    distances = distances_km(
+        contractor.current_lat, contractor.current_lng,
+        [(job.lat, job.lng) for job in pending_jobs],
+    )
+
+    # Order plain (distance, index) tuples -- nearest first, unknown
+    # distances last, ties in query order -- then serialize in that order
+    unknown = float("inf")
+    order = sorted(
+        (unknown if dist is None else round(dist, 2), i)
+        for i, dist in enumerate(distances)
+        if dist is None or dist <= radius_km
+    )
 
     nearby = []
-    for job in pending_jobs:
-        if job.lat is not None and job.lng is not None and contractor.current_lat is not None and contractor.current_lng is not None:
-            dist = _haversine(contractor.current_lat, contractor.current_lng, job.lat, job.lng)
-            if dist <= radius_km:
-                job_data = job.to_dict()
-                job_data["distance_km"] = round(dist, 2)
-                nearby.append(job_data)
-        else:
-            job_data = job.to_dict()
-            job_data["distance_km"] = None
-            nearby.append(job_data)
-
-    nearby.sort(key=lambda j: j["distance_km"] if j["distance_km"] is not None else float("inf"))
+    for dist, i in order:
+        job_data = pending_jobs[i].to_dict()
+        job_data["distance_km"] = None if dist == unknown else dist
+        nearby.append(job_data)
 
     return jsonify({"success": True, "jobs": nearby}), 200
 
@@ -192,7 +261,7 @@ def get_available_jobs(user_id):
 @require_auth
 def accept_job(user_id, job_id):
     """Accept a pending/confirmed/assigned job."""
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor profile not found"}), 404
 
@@ -219,44 +288,55 @@ def accept_job(user_id, job_id):
         data={"job_id": job.id, "status": "accepted"},
     )
     db.session.add(notification)
+
+    # Read before commit() expires the loaded rows
+    driver_info = {
+        "id": contractor.id,
+        "name": contractor.user.name if contractor.user else None,
+        "truck_type": contractor.truck_type,
+        "avg_rating": contractor.avg_rating,
+        "total_jobs": contractor.total_jobs,
+    }
     db.session.commit()
 
-    # Send APNs push to customer
-    try:
-        from notifications import send_push_notification
-        send_push_notification(
-            job.customer_id,
-            "Driver Assigned",
-            "A driver has been assigned to your job!",
-            {"job_id": job.id, "type": "job_update", "status": "accepted"}
-        )
-    except Exception as e:
-        logger.exception("Failed to send push to customer for job %s: %s", job.id, e)
+    # The APNs push runs after the response is sent.
+    threading.Thread(
+        target=_dispatch_accept_notification,
+        args=(current_app._get_current_object(), job.id, job.customer_id),
+        daemon=True,
+    ).start()
 
     # Broadcast via SocketIO
-    from socket_events import broadcast_job_accepted, socketio
     broadcast_job_accepted(job.id, contractor.id)
 
     # Also notify the customer's job room
     socketio.emit("job:driver-assigned", {
         "job_id": job.id,
-        "driver": {
-            "id": contractor.id,
-            "name": contractor.user.name if contractor.user else None,
-            "truck_type": contractor.truck_type,
-            "avg_rating": contractor.avg_rating,
-            "total_jobs": contractor.total_jobs,
-        },
+        "driver": driver_info,
     }, room=job.id)
 
     return jsonify({"success": True, "job": job.to_dict()}), 200
 
 
+def _dispatch_accept_notification(app, job_id, customer_id):
+    """Push the customer that a driver accepted their job (background task)."""
+    with app.app_context():
+        try:
+            send_push_notification(
+                customer_id,
+                "Driver Assigned",
+                "A driver has been assigned to your job!",
+                {"job_id": job_id, "type": "job_update", "status": "accepted"}
+            )
+        except Exception as e:
+            logger.exception("Failed to send push to customer for job %s: %s", job_id, e)
+
+
 @drivers_bp.route("/jobs/<job_id>/decline", methods=["POST"])
 @require_auth
 def decline_job(user_id, job_id):
     """Decline an assigned job (only if assigned to this driver)."""
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor profile not found"}), 404
 
@@ -270,18 +350,14 @@ def decline_job(user_id, job_id):
     if job.status not in ("assigned", "accepted"):
         return jsonify({"error": "Cannot decline job in status: {}".format(job.status)}), 409
 
-    # Unassign driver, revert to confirmed
+    # Unassign driver, revert to confirmed, and re-run auto-assignment to
+    # find another driver -- all in one transaction
     job.driver_id = None
     job.status = "confirmed"
     job.updated_at = utcnow()
-    db.session.commit()
-
-    # Re-run auto-assignment to find another driver
-    from routes.payments import _auto_assign_driver
     _auto_assign_driver(job)
     db.session.commit()
 
-    from socket_events import broadcast_job_status
     broadcast_job_status(job.id, job.status)
 
     return jsonify({"success": True, "job": job.to_dict()}), 200
@@ -294,13 +370,24 @@ VALID_STATUS_TRANSITIONS = {
     "arrived": ["started", "cancelled"],
     "started": ["completed"],
 }
+# Membership sets for the hot check; the lists above keep the order clients see
+_ALLOWED_TRANSITIONS = {k: frozenset(v) for k, v in VALID_STATUS_TRANSITIONS.items()}
+_NO_TRANSITIONS = frozenset()
+
+# Customer push sent when a job enters a status: (title, body, category)
+_STATUS_PUSH = {
+    "en_route": ("Your Driver Is On The Way!", "Your driver is on the way!", "job_en_route"),
+    "arrived": ("Driver Has Arrived", "Your driver has arrived at the location.", "job_arrived"),
+    "started": ("Job In Progress", "Your driver has started the job.", "job_started"),
+    "completed": ("Pickup Complete!", "Pickup complete! Rate your experience", "job_completed"),
+}
 
 
 @drivers_bp.route("/jobs/<job_id>/status", methods=["PUT"])
 @require_auth
 def update_job_status(user_id, job_id):
     """Advance the job through its lifecycle."""
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor profile not found"}), 404
 
@@ -317,20 +404,20 @@ def update_job_status(user_id, job_id):
     if not new_status:
         return jsonify({"error": "status is required"}), 400
 
-    allowed = VALID_STATUS_TRANSITIONS.get(job.status, [])
-    if new_status not in allowed:
+    if new_status not in _ALLOWED_TRANSITIONS.get(job.status, _NO_TRANSITIONS):
         return jsonify({
             "error": "Cannot transition from {} to {}".format(job.status, new_status),
-            "allowed": allowed,
+            "allowed": VALID_STATUS_TRANSITIONS.get(job.status, []),
         }), 409
 
     job.status = new_status
-    job.updated_at = utcnow()
+    now = utcnow()
+    job.updated_at = now
 
     if new_status == "started":
-        job.started_at = utcnow()
+        job.started_at = now
     elif new_status == "completed":
-        job.completed_at = utcnow()
+        job.completed_at = now
         contractor.total_jobs = (contractor.total_jobs or 0) + 1
 
         # Warn if proof photos have not been submitted
@@ -356,7 +443,7 @@ def update_job_status(user_id, job_id):
             ).first()
             if referral:
                 referral.status = "completed"
-                referral.completed_at = utcnow()
+                referral.completed_at = now
                 logger.info(
                     "Referral %s completed: referee %s first job %s done",
                     referral.id, job.customer_id, job.id,
@@ -378,60 +465,55 @@ def update_job_status(user_id, job_id):
         data={"job_id": job.id, "status": new_status},
     )
     db.session.add(notification)
+
     db.session.commit()
 
-    # --- Email / SMS / Push notifications for key status changes ---
-    driver_name = contractor.user.name if contractor.user else None
-    try:
-        from notifications import (
-            send_driver_en_route_email, send_driver_en_route_sms,
-            send_job_completed_email, send_push_notification,
-        )
-        customer = db.session.get(User, job.customer_id)
+    # Email / SMS / push run after the response is sent.
+    if new_status in _STATUS_PUSH:
+        threading.Thread(
+            target=_dispatch_status_notifications,
+            args=(current_app._get_current_object(), job.id, contractor.id, new_status),
+            daemon=True,
+        ).start()
 
-        if new_status == "en_route":
-            # Email + SMS customer, push to customer
-            if customer:
-                if customer.email:
-                    send_driver_en_route_email(customer.email, customer.name, driver_name, job.address)
-                if customer.phone:
-                    send_driver_en_route_sms(customer.phone, driver_name, job.address)
-                send_push_notification(
-                    customer.id, "Your Driver Is On The Way!",
-                    "Your driver is on the way!",
-                    {"job_id": job.id, "status": "en_route", "category": "job_en_route"},
-                )
+    # Broadcast via SocketIO
+    broadcast_job_status(job.id, new_status)
 
-        elif new_status == "arrived":
-            if customer:
-                send_push_notification(
-                    customer.id, "Driver Has Arrived",
-                    "Your driver has arrived at the location.",
-                    {"job_id": job.id, "status": "arrived", "category": "job_arrived"},
-                )
+    return jsonify({"success": True, "job": job.to_dict()}), 200
 
-        elif new_status == "started":
-            if customer:
-                send_push_notification(
-                    customer.id, "Job In Progress",
-                    "Your driver has started the job.",
-                    {"job_id": job.id, "status": "started", "category": "job_started"},
-                )
 
-        elif new_status == "completed":
-            # Email + push to customer
+def _dispatch_status_notifications(app, job_id, contractor_id, new_status):
+    """Email / SMS / push the customer (and operator) about a status change (background task)."""
+    with app.app_context():
+        job = db.session.get(Job, job_id, options=[joinedload(Job.customer)])
+        contractor = db.session.get(
+            Contractor, contractor_id, options=[joinedload(Contractor.user)]
+        )
+        if not job or not contractor:
+            return
+
+        customer = job.customer
+        driver_name = contractor.user.name if contractor.user else None
+
+        try:
             if customer:
-                if customer.email:
+                if new_status == "en_route":
+                    # Email + SMS customer ahead of the push
+                    if customer.email:
+                        send_driver_en_route_email(customer.email, customer.name, driver_name, job.address)
+                    if customer.phone:
+                        send_driver_en_route_sms(customer.phone, driver_name, job.address)
+                elif new_status == "completed" and customer.email:
                     send_job_completed_email(customer.email, customer.name, job.id, job.address)
+                title, body, category = _STATUS_PUSH[new_status]
                 send_push_notification(
-                    customer.id, "Pickup Complete!",
-                    "Pickup complete! Rate your experience",
-                    {"job_id": job.id, "status": "completed", "category": "job_completed"},
+                    customer.id, title, body,
+                    {"job_id": job.id, "status": new_status, "category": category},
                 )
+
             # Push to operator if job was delegated
-            if job.operator_id:
-                from models import Contractor as _Contractor
-                op = db.session.get(_Contractor, job.operator_id)
+            if new_status == "completed" and job.operator_id:
+                op = db.session.get(Contractor, job.operator_id)
                 if op:
                     send_push_notification(
                         op.user_id, "Job Completed",
@@ -440,15 +522,8 @@ def update_job_status(user_id, job_id):
                         ),
                         {"job_id": job.id, "driver_id": contractor.id},
                     )
-    except Exception as e:
-        import logging as _log
-        _log.getLogger(__name__).exception("Notification failed for job %s: %s", job.id, e)
-
-    # Broadcast via SocketIO
-    from socket_events import broadcast_job_status
-    broadcast_job_status(job.id, new_status)
-
-    return jsonify({"success": True, "job": job.to_dict()}), 200
+        except Exception as e:
+            logger.exception("Notification failed for job %s: %s", job.id, e)
 
 
 @drivers_bp.route("/jobs/<job_id>/proof", methods=["POST"])
@@ -463,10 +538,7 @@ def submit_job_proof(user_id, job_id):
     Only works on jobs with status 'started' or 'completed'.
     Sets proof_submitted_at to the current time.
     """
-    import logging
-    logger = logging.getLogger(__name__)
-
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor profile not found"}), 404
 
@@ -500,8 +572,9 @@ def submit_job_proof(user_id, job_id):
             return jsonify({"error": "after_photos must be a list of URLs"}), 400
         job.after_photos = after_photos
 
-    job.proof_submitted_at = utcnow()
-    job.updated_at = utcnow()
+    now = utcnow()
+    job.proof_submitted_at = now
+    job.updated_at = now
 
     db.session.commit()
 
@@ -514,12 +587,7 @@ def submit_job_proof(user_id, job_id):
 @require_auth
 def propose_volume_adjustment(user_id, job_id):
     """Driver proposes a volume adjustment after arriving on-site."""
-    from routes.booking import calculate_estimate
-    from notifications import send_push_notification
-    from socket_events import socketio
-    import stripe
-
-    contractor = Contractor.query.filter_by(user_id=user_id).first()
+    contractor = _get_contractor(user_id)
     if not contractor:
         return jsonify({"error": "Contractor not found"}), 404
 
@@ -552,8 +620,9 @@ def propose_volume_adjustment(user_id, job_id):
     # Calculate new price
     try:
         items = [{"category": "general", "quantity": quantity}]
-        result = calculate_estimate(items, scheduled_date=None, lat=None, lng=None)
-        new_price = result["grand_total"]
+        # Only four distinct inputs, so this is nearly always a cache hit
+        result = cached_calculate_estimate(items)
+        new_price = result["total"]
     except Exception as e:
         logger.exception("Failed to calculate new price for volume adjustment")
         return jsonify({"error": "Failed to calculate new price"}), 500
@@ -567,7 +636,7 @@ def propose_volume_adjustment(user_id, job_id):
         # Update Stripe PaymentIntent if it exists
         try:
             if job.payment and job.payment.stripe_payment_intent_id:
-                stripe.PaymentIntent.modify(
+                _get_stripe().PaymentIntent.modify(
                     job.payment.stripe_payment_intent_id,
                     amount=int(new_price * 100)
                 )
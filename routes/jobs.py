@@ -11,6 +11,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from datetime import datetime, timezone, timedelta
 from werkzeug.utils import secure_filename
 
+from sqlalchemy.orm import joinedload, noload
+
 from models import db, Job, Contractor, Rating, Payment, User, Notification, generate_uuid, utcnow
 from auth_routes import require_auth
 from notifications import send_push_notification
@@ -51,7 +53,12 @@ def lookup_by_confirmation_code(confirmation_code):
     if not code or len(code) != 8:
         return jsonify({"error": "Invalid confirmation code format"}), 400
 
-    job = Job.query.filter_by(confirmation_code=code).first()
+    # One SELECT for the job, its contractor and the contractor's name;
+    # payment/rating are never exposed here, so skip their default joins
+    job = Job.query.options(
+        joinedload(Job.driver).joinedload(Contractor.user),
+        noload(Job.payment), noload(Job.rating),
+    ).filter_by(confirmation_code=code).first()
     if not job:
         return jsonify({"error": "No job found with that confirmation code"}), 404
 
@@ -74,17 +81,14 @@ def lookup_by_confirmation_code(confirmation_code):
     }
 
     # Include contractor info if assigned
-    if job.driver_id:
-        contractor = db.session.get(Contractor, job.driver_id)
-        if contractor:
-            result["contractor"] = {
-                "name": contractor.user.name if contractor.user else None,
-                "truck_type": contractor.truck_type,
-                "avg_rating": contractor.avg_rating,
-                "total_jobs": contractor.total_jobs,
-            }
-        else:
-            result["contractor"] = None
+    contractor = job.driver
+    if contractor:
+        result["contractor"] = {
+            "name": contractor.user.name if contractor.user else None,
+            "truck_type": contractor.truck_type,
+            "avg_rating": contractor.avg_rating,
+            "total_jobs": contractor.total_jobs,
+        }
     else:
         result["contractor"] = None
 
@@ -141,7 +145,11 @@ def get_job(user_id, job_id):
     Return a single job detail for the authenticated customer.
     Includes nested payment, rating, and contractor info.
     """
-    job = db.session.get(Job, job_id)
+    # payment/rating are joined by default; pull the contractor and its
+    # user into the same SELECT
+    job = db.session.get(
+        Job, job_id, options=[joinedload(Job.driver).joinedload(Contractor.user)]
+    )
     if not job or job.customer_id != user_id:
         return jsonify({"error": "Job not found"}), 404
 
@@ -170,15 +178,7 @@ def get_job(user_id, job_id):
         job_dict["rating"] = None
 
     # Include contractor info
-    if job.driver_id:
-        contractor = db.session.get(Contractor, job.driver_id)
-        if contractor:
-            contractor_dict = contractor.to_dict()
-            job_dict["contractor"] = contractor_dict
-        else:
-            job_dict["contractor"] = None
-    else:
-        job_dict["contractor"] = None
+    job_dict["contractor"] = job.driver.to_dict() if job.driver else None
 
     return jsonify({"success": True, "job": job_dict}), 200
 
@@ -199,7 +199,7 @@ def cancel_job(user_id, job_id):
     - If cancelled after driver assignment, notify the driver via push.
     - Creates a Notification record for the customer.
     """
-    job = db.session.get(Job, job_id)
+    job = db.session.get(Job, job_id, options=[joinedload(Job.driver)])
     if not job or job.customer_id != user_id:
         return jsonify({"error": "Job not found"}), 404
 
@@ -228,7 +228,7 @@ def cancel_job(user_id, job_id):
 
     # --- Notify assigned driver via push ---
     if had_driver:
-        driver = db.session.get(Contractor, job.driver_id)
+        driver = job.driver
         if driver:
             send_push_notification(
                 driver.user_id,
@@ -285,7 +285,7 @@ def reschedule_job(user_id, job_id):
     - If a driver is assigned, notify them of the change via push.
     - Creates Notification records.
     """
-    job = db.session.get(Job, job_id)
+    job = db.session.get(Job, job_id, options=[joinedload(Job.driver)])
     if not job or job.customer_id != user_id:
         return jsonify({"error": "Job not found"}), 404
 
@@ -319,7 +319,7 @@ def reschedule_job(user_id, job_id):
 
     # --- Notify assigned driver ---
     if job.driver_id:
-        driver = db.session.get(Contractor, job.driver_id)
+        driver = job.driver
         if driver:
             send_push_notification(
                 driver.user_id,
@@ -7,6 +7,9 @@ import os
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timezone, timedelta
 
+from sqlalchemy import insert
+from sqlalchemy.orm import contains_eager
+
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -583,10 +586,12 @@ def get_earnings_history(user_id):
     seven_days_ago = now - timedelta(days=7)
     thirty_days_ago = now - timedelta(days=30)
 
-    # Query all succeeded payments for this driver
+    # Query all succeeded payments for this driver; the joined Job row
+    # populates payment.job so the loop below doesn't SELECT per payment.
     payments = (
         Payment.query
         .join(Job, Payment.job_id == Job.id)
+        .options(contains_eager(Payment.job))
         .filter(Job.driver_id == contractor.id, Payment.payment_status == "succeeded")
         .order_by(Payment.created_at.desc())
         .all()
@@ -595,7 +600,7 @@ def get_earnings_history(user_id):
     # Build entries
     entries = []
     for payment in payments:
-        job = db.session.get(Job, payment.job_id)
+        job = payment.job
         payout = payment.driver_payout_amount or 0.0
         entries.append({
             "id": payment.id,
@@ -819,27 +824,25 @@ def _auto_assign_driver(job):
         job.status = "assigned"
         job.updated_at = utcnow()
 
-        # Notify driver
-        notification = Notification(
-            id=generate_uuid(),
-            user_id=best.user_id,
-            type="job_assigned",
-            title="New Job Assigned",
-            body="You've been assigned a job at {}.".format(job.address or "an address"),
-            data={"job_id": job.id, "address": job.address, "total_price": job.total_price},
-        )
-        db.session.add(notification)
-
-        # Notify customer
-        notification_cust = Notification(
-            id=generate_uuid(),
-            user_id=job.customer_id,
-            type="job_update",
-            title="Driver Assigned",
-            body="A driver has been assigned to your job.",
-            data={"job_id": job.id, "status": "assigned"},
-        )
-        db.session.add(notification_cust)
+        # Notify driver and customer: one multi-row INSERT
+        db.session.execute(insert(Notification), [
+            {
+                "id": generate_uuid(),
+                "user_id": best.user_id,
+                "type": "job_assigned",
+                "title": "New Job Assigned",
+                "body": "You've been assigned a job at {}.".format(job.address or "an address"),
+                "data": {"job_id": job.id, "address": job.address, "total_price": job.total_price},
+            },
+            {
+                "id": generate_uuid(),
+                "user_id": job.customer_id,
+                "type": "job_update",
+                "title": "Driver Assigned",
+                "body": "A driver has been assigned to your job.",
+                "data": {"job_id": job.id, "status": "assigned"},
+            },
+        ])
 
         # Emit SocketIO events
         from socket_events import socketio
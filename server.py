@@ -7,6 +7,7 @@ import logging
 
 from sanitize import sanitize_dict
 from extensions import limiter
+from json_provider import init_json_provider
 
 from app_config import Config
 from database import Database
@@ -68,6 +69,7 @@ if _flask_env != "development":
 
 app = Flask(__name__)
 app.config.from_object(Config)
+init_json_provider(app)
 
 # ---------------------------------------------------------------------------
 # SQLAlchemy configuration
@@ -78,6 +80,14 @@ if database_url:
     if database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    # Connection pool per worker process; keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the server's limit.
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "20")),
+        "pool_pre_ping": True,   # drop connections the server closed while idle
+        "pool_recycle": 300,     # seconds
+    }
 else:
     # Fallback to SQLite for local development
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///umuve.db"
@@ -608,7 +618,7 @@ def portal_create_booking():
     """
     from werkzeug.security import generate_password_hash
     from models import Job, Payment, User, Notification, generate_uuid, utcnow
-    from routes.booking import calculate_estimate, _notify_nearby_contractors
+    from routes.booking import calculate_estimate, queue_new_job_notifications
 
     data = request.get_json() or {}
 
@@ -750,8 +760,8 @@ def portal_create_booking():
     )
     sqlalchemy_db.session.add(payment)
 
-    _notify_nearby_contractors(job)
     sqlalchemy_db.session.commit()
+    queue_new_job_notifications(job)
 
     # Send confirmation email and SMS
     from notifications import send_booking_confirmation_email, send_booking_sms
@@ -5,26 +5,17 @@ Socket.IO event handlers for Umuve real-time features.
 - New-job alerts to nearby drivers
 """
 
-from math import radians, cos, sin, asin, sqrt
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask import request
 
 from models import db, Contractor, Job
+from geofencing import within_radius
 
 socketio = SocketIO()
 
-EARTH_RADIUS_KM = 6371.0
 DRIVER_BROADCAST_RADIUS_KM = 30.0
 
 
-def _haversine(lat1, lng1, lat2, lng2):
-    lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
-    dlat = lat2 - lat1
-    dlng = lng2 - lng1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlng / 2) ** 2
-    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
-
-
 @socketio.on("connect")
 def handle_connect():
     print("[socket] Client connected: {}".format(request.sid))
@@ -271,10 +262,14 @@ def notify_nearby_drivers(job):
         socketio.emit("job:new", job.to_dict(), namespace="/")
         return
 
-    contractors = Contractor.query.filter_by(is_online=True, approval_status="approved", is_operator=False).all()
-    for c in contractors:
-        if c.current_lat is None or c.current_lng is None:
-            continue
-        dist = _haversine(job.lat, job.lng, c.current_lat, c.current_lng)
-        if dist <= DRIVER_BROADCAST_RADIUS_KM:
-            socketio.emit("job:new", job.to_dict(), room=f"driver:{c.id}")
+    contractors = (
+        db.session.query(Contractor.id, Contractor.current_lat, Contractor.current_lng)
+        .filter_by(is_online=True, approval_status="approved", is_operator=False)
+        .all()
+    )
+    nearby = within_radius(job.lat, job.lng, contractors, DRIVER_BROADCAST_RADIUS_KM)
+    if not nearby:
+        return
+    payload = job.to_dict()
+    for c in nearby:
+        socketio.emit("job:new", payload, room=f"driver:{c.id}")